@@ -7,11 +7,12 @@ and viewing real-time statistics.
 """
 
 from .switch_controller import SwitchController, SwitchInterface, SwitchConfig
-from .stats_viewer import StatsViewer
+from .stats_viewer import StatsViewer, MacTable
 
 __all__ = [
     'SwitchController',
     'SwitchInterface',
     'SwitchConfig',
     'StatsViewer',
+    'MacTable',
 ]
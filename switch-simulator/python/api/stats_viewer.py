@@ -8,19 +8,43 @@ including port statistics, VLAN usage, MAC table entries, and routing informatio
 import os
 import sys
 import time
-from typing import Dict, List, Optional, Tuple, Union, Any
+import itertools
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple, Union, Any
 import logging
 import threading
 import json
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Number of samples retained per port in the stats history
+STATS_HISTORY_SIZE = 100
+
+# Report row templates, formatted with (id, stats dict)
+_TEXT_PORT_ROW = "  Port {0}: {1[link_status]}, RX: {1[rx_packets]} packets, TX: {1[tx_packets]} packets".format
+_TEXT_VLAN_ROW = "  VLAN {0} ({1[name]}): {1[port_count]} ports, {1[mac_address_count]} MAC addresses".format
+_HTML_PORT_ROW = ("<tr><td>{0}</td><td>{1[link_status]}</td>"
+                  "<td>{1[rx_packets]}</td><td>{1[tx_packets]}</td></tr>").format
+
+# Assuming 1Gbps port speed for utilization calculation
+# This should be retrieved from the actual port configuration
+PORT_SPEED_BPS = 1_000_000_000  # 1 Gbps
+
+# Logging is configured by the application (e.g. the CLI), not by the library
 logger = logging.getLogger(__name__)
 
+# orjson is an optional, faster JSON encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# NumPy is optional and only used to vectorize bulk calculations
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Import SwitchController
 try:
     from .switch_controller import SwitchController
@@ -28,6 +52,69 @@ except ImportError:
     logger.warning("Could not import SwitchController, some functionality may be limited")
 
 
+class MacTable:
+    """MAC address table stored as parallel columns (struct of arrays)"""
+    
+    ENTRY_TYPES = ('dynamic', 'static')
+    
+    __slots__ = ('macs', 'vlans', 'ports', 'types')
+    
+    def __init__(self):
+        self.macs = array('Q')   # 48-bit MAC addresses in 64-bit slots
+        self.vlans = array('H')
+        self.ports = array('H')
+        self.types = array('B')  # Index into ENTRY_TYPES
+    
+    def add_entry(self, mac_address: str, vlan: int, port: int, entry_type: str = 'dynamic'):
+        """
+        Append an entry to the table
+        
+        Args:
+            mac_address: MAC address in colon-separated hex notation
+            vlan: VLAN ID
+            port: Port ID
+            entry_type: Entry type ('dynamic' or 'static')
+        """
+        self.macs.append(int(mac_address.replace(':', ''), 16))
+        self.vlans.append(vlan)
+        self.ports.append(port)
+        self.types.append(self.ENTRY_TYPES.index(entry_type))
+    
+    @staticmethod
+    def format_mac(mac: int) -> str:
+        """Format a 48-bit MAC address as colon-separated hex"""
+        digits = f"{mac:012X}"
+        return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+    
+    def __len__(self) -> int:
+        return len(self.macs)
+    
+    def __iter__(self):
+        """Iterate over the entries as dictionaries"""
+        entry_types = self.ENTRY_TYPES
+        for mac, vlan, port, entry_type in zip(self.macs, self.vlans, self.ports, self.types):
+            yield {"mac_address": self.format_mac(mac), "vlan": vlan,
+                   "port": port, "type": entry_types[entry_type]}
+    
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Convert the table to a list of entry dictionaries"""
+        return list(self)
+
+
+class _PortRing:
+    """Stats history of a single port, guarded by its own lock"""
+    
+    __slots__ = ('samples', 'ticks', 'lock')
+    
+    def __init__(self):
+        # Fixed-size ring buffer, the oldest entry is evicted on append
+        self.samples = deque(maxlen=STATS_HISTORY_SIZE)
+        # Sequence number of the tick each sample was taken in, as a port
+        # has no sample in the ticks before it appears or when reading fails
+        self.ticks = deque(maxlen=STATS_HISTORY_SIZE)
+        self.lock = threading.Lock()
+
+
 class StatsCollector:
     """Collects and stores statistics from the switch"""
     
@@ -39,22 +126,36 @@ class StatsCollector:
             controller: The switch controller instance
         """
         self.controller = controller
+        # Timestamps are shared by all ports sampled in the same tick, so they
+        # are kept once per tick and looked up by the tick of each port sample
         self.stats_history = {
+            'tick_timestamps': deque(maxlen=STATS_HISTORY_SIZE),
             'ports': {},
             'vlans': {},
             'mac_table': [],
             'routing_table': []
         }
+        self._tick_monotonic = deque(maxlen=STATS_HISTORY_SIZE)
+        self._tick_count = 0
+        self._tick_lock = threading.Lock()
+        # Readers only contend with the collector on the port they look at
+        self._port_rings: Dict[int, _PortRing] = {}
         self._collection_thread = None
         self._running = False
+        self._stop_event = threading.Event()
         self._collection_interval = 5  # seconds
+        self._idle_timeout = None  # seconds without readers before collection pauses
+        self._last_read_ts = time.monotonic()
     
-    def start_collection(self, interval: int = 5) -> bool:
+    def start_collection(self, interval: int = 5, idle_timeout: Optional[float] = None) -> bool:
         """
         Start collecting statistics in the background
         
         Args:
             interval: Collection interval in seconds
+            idle_timeout: Optional time in seconds after the last read of the
+                statistics at which collection pauses until the next read.
+                If None, statistics are always collected.
             
         Returns:
             bool: True if collection started successfully
@@ -64,11 +165,14 @@ class StatsCollector:
             return False
         
         self._collection_interval = interval
+        self._idle_timeout = idle_timeout
+        self._last_read_ts = time.monotonic()
         self._running = True
+        self._stop_event.clear()
         self._collection_thread = threading.Thread(target=self._collection_loop)
         self._collection_thread.daemon = True
         self._collection_thread.start()
-        logger.info(f"Started stats collection with interval {interval} seconds")
+        logger.info("Started stats collection with interval %s seconds", interval)
         return True
     
     def stop_collection(self) -> bool:
@@ -83,6 +187,7 @@ class StatsCollector:
             return False
         
         self._running = False
+        self._stop_event.set()
         if self._collection_thread:
             self._collection_thread.join(timeout=2.0)
         logger.info("Stopped stats collection")
@@ -92,37 +197,55 @@ class StatsCollector:
         """Background loop for collecting statistics"""
         while self._running:
             try:
-                self._collect_stats()
-                time.sleep(self._collection_interval)
+                if not self._is_idle():
+                    self._collect_stats()
+                wait_time = self._collection_interval
             except Exception as e:
-                logger.error(f"Error in stats collection: {e}")
-                time.sleep(1)  # Shorter sleep on error
+                logger.error("Error in stats collection: %s", e)
+                wait_time = 1  # Shorter wait on error
+            
+            # Returns early as soon as stop_collection() sets the event
+            if self._stop_event.wait(wait_time):
+                break
+    
+    def _is_idle(self) -> bool:
+        """Check whether the statistics have not been read within the idle timeout"""
+        return (self._idle_timeout is not None and
+                time.monotonic() - self._last_read_ts > self._idle_timeout)
     
     def _collect_stats(self):
         """Collect current statistics from the switch"""
-        timestamp = datetime.now().isoformat()
+        with self._tick_lock:
+            self.stats_history['tick_timestamps'].append(datetime.now().isoformat(timespec='seconds'))
+            self._tick_monotonic.append(time.monotonic())
+            tick = self._tick_count
+            self._tick_count += 1
         
         # Collect port statistics
-        for interface in self.controller.get_all_interfaces():
-            port_id = interface.port_id
-            stats = interface.get_statistics()
-            
-            if port_id not in self.stats_history['ports']:
-                self.stats_history['ports'][port_id] = []
-            
-            # Add timestamp to stats
-            stats['timestamp'] = timestamp
+        for port_id, stats in self.controller.get_all_port_statistics().items():
+            ring = self._port_rings.get(port_id)
+            if ring is None:
+                ring = self._port_rings[port_id] = _PortRing()
+                self.stats_history['ports'][port_id] = ring.samples
             
             # Store statistics
-            self.stats_history['ports'][port_id].append(stats)
-            
-            # Keep only the last 100 entries to limit memory usage
-            if len(self.stats_history['ports'][port_id]) > 100:
-                self.stats_history['ports'][port_id].pop(0)
+            with ring.lock:
+                ring.samples.append(stats)
+                ring.ticks.append(tick)
         
         # Here we would also collect VLAN, MAC table and routing statistics
         # For now, this is a placeholder
     
+    def get_port_ids(self) -> List[int]:
+        """
+        Get the IDs of all ports with collected statistics
+        
+        Returns:
+            List of port IDs
+        """
+        self._last_read_ts = time.monotonic()
+        return list(self._port_rings)
+    
     def get_port_stats_history(self, port_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get historical statistics for a port
@@ -134,10 +257,93 @@ class StatsCollector:
         Returns:
             List of statistics dictionaries
         """
-        if port_id not in self.stats_history['ports']:
+        self._last_read_ts = time.monotonic()
+        ring = self._port_rings.get(port_id)
+        if ring is None:
             return []
         
-        return self.stats_history['ports'][port_id][-limit:]
+        with ring.lock:
+            start = len(ring.samples) - max(0, min(limit, len(ring.samples)))
+            samples = list(itertools.islice(ring.samples, start, None))
+            ticks = list(itertools.islice(ring.ticks, start, None))
+        
+        return [
+            dict(stats, timestamp=timestamp, ts_monotonic=ts_monotonic)
+            for stats, timestamp, ts_monotonic in self._join_tick_times(samples, ticks)
+        ]
+    
+    def get_port_stats_bounds(self, port_id: int, limit: int = 10
+                              ) -> Optional[Tuple[Dict[str, Any], float, Dict[str, Any], float]]:
+        """
+        Get the oldest and newest of the entries get_port_stats_history would
+        return, without copying the history
+        
+        Args:
+            port_id: The port ID
+            limit: Maximum number of entries to consider
+            
+        Returns:
+            (oldest stats, its monotonic timestamp, newest stats, its
+            monotonic timestamp), or None if there are fewer than two entries
+        """
+        self._last_read_ts = time.monotonic()
+        ring = self._port_rings.get(port_id)
+        if ring is None:
+            return None
+        
+        # The collector never holds both locks, so nesting them is safe
+        with ring.lock, self._tick_lock:
+            first_tick = self._tick_count - len(self._tick_monotonic)
+            start = len(ring.samples) - max(0, min(limit, len(ring.samples)))
+            # Samples older than the retained ticks have no timestamp
+            while start < len(ring.samples) and ring.ticks[start] < first_tick:
+                start += 1
+            if len(ring.samples) - start < 2:
+                return None
+            
+            return (ring.samples[start], self._tick_monotonic[ring.ticks[start] - first_tick],
+                    ring.samples[-1], self._tick_monotonic[ring.ticks[-1] - first_tick])
+    
+    def _join_tick_times(self, samples: List[Dict[str, Any]],
+                         ticks: List[int]) -> List[Tuple[Dict[str, Any], str, float]]:
+        """
+        Join port samples with the timestamps of the ticks they were taken in
+        
+        Args:
+            samples: Port samples, oldest first
+            ticks: Tick sequence number of each sample
+            
+        Returns:
+            List of (stats, timestamp, monotonic timestamp) tuples. Samples
+            older than the retained ticks have no timestamp and are left out.
+        """
+        with self._tick_lock:
+            first_tick = self._tick_count - len(self._tick_monotonic)
+            tick_timestamps = self.stats_history['tick_timestamps']
+            return [
+                (stats, tick_timestamps[tick - first_tick], self._tick_monotonic[tick - first_tick])
+                for stats, tick in zip(samples, ticks)
+                if tick >= first_tick
+            ]
+    
+    def _snapshot_history(self) -> Dict[str, Any]:
+        """Take a consistent copy of the stats history for export"""
+        snapshot = dict(self.stats_history)
+        with self._tick_lock:
+            snapshot['tick_timestamps'] = list(self.stats_history['tick_timestamps'])
+        
+        # Ports may miss ticks, so each sample carries the timestamp of its own
+        ports = {}
+        for port_id, ring in list(self._port_rings.items()):
+            with ring.lock:
+                samples = list(ring.samples)
+                ticks = list(ring.ticks)
+            ports[port_id] = [
+                dict(stats, timestamp=timestamp)
+                for stats, timestamp, _ in self._join_tick_times(samples, ticks)
+            ]
+        snapshot['ports'] = ports
+        return snapshot
     
     def export_stats(self, filename: str) -> bool:
         """
@@ -150,12 +356,21 @@ class StatsCollector:
             bool: True if export was successful
         """
         try:
-            with open(filename, 'w') as f:
-                json.dump(self.stats_history, f, indent=2)
-            logger.info(f"Exported statistics to {filename}")
+            history = self._snapshot_history()
+            if orjson is not None:
+                with open(filename, 'wb') as f:
+                    f.write(orjson.dumps(
+                        history,
+                        default=list,
+                        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                    ))
+            else:
+                with open(filename, 'w') as f:
+                    json.dump(history, f, indent=2, default=list)
+            logger.info("Exported statistics to %s", filename)
             return True
         except Exception as e:
-            logger.error(f"Failed to export statistics: {e}")
+            logger.error("Failed to export statistics: %s", e)
             return False
 
 
@@ -172,17 +387,19 @@ class StatsViewer:
         self.controller = controller
         self.collector = StatsCollector(controller)
     
-    def start_collection(self, interval: int = 5) -> bool:
+    def start_collection(self, interval: int = 5, idle_timeout: Optional[float] = None) -> bool:
         """
         Start collecting statistics
         
         Args:
             interval: Collection interval in seconds
+            idle_timeout: Optional time in seconds without reads after which
+                collection pauses until the statistics are read again
             
         Returns:
             bool: True if collection started successfully
         """
-        return self.collector.start_collection(interval)
+        return self.collector.start_collection(interval, idle_timeout)
     
     def stop_collection(self) -> bool:
         """
@@ -207,18 +424,31 @@ class StatsViewer:
             interface = self.controller.get_interface(port_id)
             return {port_id: interface.get_statistics()}
         else:
-            result = {}
-            for interface in self.controller.get_all_interfaces():
-                result[interface.port_id] = interface.get_statistics()
-            return result
+            return self.controller.get_all_port_statistics()
     
-    def get_port_utilization(self, port_id: int, time_period: int = 60) -> Dict[str, Any]:
+    def get_port_stats_bulk(self, port_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get current statistics for several ports with a single controller call
+        
+        Args:
+            port_ids: IDs of the ports to get statistics for
+            
+        Returns:
+            Dictionary mapping each requested, existing port ID to its statistics
+        """
+        all_stats = self.controller.get_all_port_statistics()
+        return {port_id: all_stats[port_id] for port_id in port_ids if port_id in all_stats}
+    
+    def get_port_utilization(self, port_id: int, time_period: int = 60,
+                             fresh: bool = False) -> Dict[str, Any]:
         """
         Calculate port utilization over a time period
         
         Args:
             port_id: The port ID
             time_period: Time period in seconds
+            fresh: If True, read the current counters from the switch and use
+                them instead of the newest collected sample
             
         Returns:
             Dictionary with utilization statistics
@@ -226,6 +456,11 @@ class StatsViewer:
         # Get historical data for the port
         stats_history = self.collector.get_port_stats_history(port_id)
         
+        if fresh and stats_history:
+            current = self.controller.get_port_statistics(port_id)
+            current['ts_monotonic'] = time.monotonic()
+            stats_history.append(current)
+        
         if not stats_history or len(stats_history) < 2:
             return {"error": "Not enough historical data available"}
         
@@ -235,10 +470,8 @@ class StatsViewer:
         
         # Calculate time delta in seconds
         try:
-            time_start = datetime.fromisoformat(oldest['timestamp'])
-            time_end = datetime.fromisoformat(newest['timestamp'])
-            time_delta = (time_end - time_start).total_seconds()
-        except (KeyError, ValueError):
+            time_delta = newest['ts_monotonic'] - oldest['ts_monotonic']
+        except KeyError:
             time_delta = time_period  # Fallback
         
         if time_delta <= 0:
@@ -251,12 +484,65 @@ class StatsViewer:
         rx_rate_bps = (rx_bytes_delta * 8) / time_delta
         tx_rate_bps = (tx_bytes_delta * 8) / time_delta
         
-        # Assuming 1Gbps port speed for utilization calculation
-        # This should be retrieved from the actual port configuration
-        port_speed_bps = 1_000_000_000  # 1 Gbps
+        return self._utilization_result(port_id, time_delta, rx_rate_bps, tx_rate_bps)
+    
+    def get_all_port_utilization(self, time_period: int = 60) -> Dict[int, Dict[str, Any]]:
+        """
+        Calculate utilization for all ports over a time period
+        
+        Only the oldest and newest history entry of each port are read, and
+        the rates of all ports are computed in a single vectorized pass when
+        NumPy is available.
         
-        rx_utilization = (rx_rate_bps / port_speed_bps) * 100
-        tx_utilization = (tx_rate_bps / port_speed_bps) * 100
+        Args:
+            time_period: Time period in seconds
+            
+        Returns:
+            Dictionary mapping port IDs to utilization statistics
+        """
+        port_ids = self.collector.get_port_ids()
+        if np is None:
+            return {port_id: self.get_port_utilization(port_id, time_period)
+                    for port_id in port_ids}
+        
+        result = {}
+        bounds = []
+        for port_id in port_ids:
+            port_bounds = self.collector.get_port_stats_bounds(port_id)
+            if port_bounds is None:
+                result[port_id] = {"error": "Not enough historical data available"}
+                continue
+            
+            oldest, oldest_ts, newest, newest_ts = port_bounds
+            bounds.append((port_id,
+                           oldest['rx_bytes'], oldest['tx_bytes'], oldest_ts,
+                           newest['rx_bytes'], newest['tx_bytes'], newest_ts))
+        
+        if bounds:
+            # Columns: rx_bytes, tx_bytes, timestamp of the oldest then the newest sample
+            counters = np.array([row[1:] for row in bounds], dtype=np.float64)
+            deltas = counters[:, 3:] - counters[:, :3]
+            time_deltas = deltas[:, 2]
+            valid = time_deltas > 0
+            rates_bps = np.zeros((len(bounds), 2))
+            rates_bps[valid] = deltas[valid, :2] * 8 / time_deltas[valid, np.newaxis]
+            
+            for row, is_valid, time_delta, (rx_rate_bps, tx_rate_bps) in zip(
+                    bounds, valid.tolist(), time_deltas.tolist(), rates_bps.tolist()):
+                if is_valid:
+                    result[row[0]] = self._utilization_result(row[0], time_delta,
+                                                              rx_rate_bps, tx_rate_bps)
+                else:
+                    result[row[0]] = {"error": "Invalid time period"}
+        
+        return result
+    
+    @staticmethod
+    def _utilization_result(port_id: int, time_delta: float,
+                            rx_rate_bps: float, tx_rate_bps: float) -> Dict[str, Any]:
+        """Build the utilization dictionary for a port from its byte rates"""
+        rx_utilization = (rx_rate_bps / PORT_SPEED_BPS) * 100
+        tx_utilization = (tx_rate_bps / PORT_SPEED_BPS) * 100
         
         return {
             "port_id": port_id,
@@ -270,19 +556,19 @@ class StatsViewer:
             "total_utilization_percent": (rx_utilization + tx_utilization) / 2
         }
     
-    def get_mac_table(self) -> List[Dict[str, Any]]:
+    def get_mac_table(self) -> MacTable:
         """
         Get the current MAC address table
         
         Returns:
-            List of MAC table entries
+            MAC table, iterating over it yields the entries as dictionaries
         """
         # This would call into the controller to get MAC table
         # For now, return a placeholder
-        return [
-            {"mac_address": "00:11:22:33:44:55", "vlan": 1, "port": 1, "type": "dynamic"},
-            {"mac_address": "66:77:88:99:AA:BB", "vlan": 1, "port": 2, "type": "dynamic"}
-        ]
+        mac_table = MacTable()
+        mac_table.add_entry("00:11:22:33:44:55", 1, 1, "dynamic")
+        mac_table.add_entry("66:77:88:99:AA:BB", 1, 2, "dynamic")
+        return mac_table
     
     def get_vlan_statistics(self) -> Dict[int, Dict[str, Any]]:
         """
@@ -348,36 +634,39 @@ class StatsViewer:
         
         # Compile the report data
         report_data = {
-            "generated_at": datetime.now().isoformat(),
+            "generated_at": datetime.now().isoformat(timespec='seconds'),
             "switch_info": {
                 "hostname": self.controller.config.hostname,
                 "port_count": self.controller.config.num_ports
             },
             "port_statistics": port_stats,
             "vlan_statistics": vlan_stats,
-            "mac_table": mac_table,
+            "mac_table": mac_table.to_list(),
             "routing_statistics": routing_stats
         }
         
         # Generate the report in the requested format
         if output_format == 'json':
+            if orjson is not None:
+                return orjson.dumps(
+                    report_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                ).decode()
             return json.dumps(report_data, indent=2)
         elif output_format == 'html':
             # A very simple HTML report
-            html = "<html><head><title>Switch Simulator Report</title></head><body>"
-            html += f"<h1>Switch Report: {report_data['switch_info']['hostname']}</h1>"
-            html += f"<p>Generated at: {report_data['generated_at']}</p>"
-            
-            html += "<h2>Port Statistics</h2>"
-            html += "<table border='1'><tr><th>Port</th><th>Status</th><th>RX Packets</th><th>TX Packets</th></tr>"
-            for port_id, stats in port_stats.items():
-                html += f"<tr><td>{port_id}</td><td>{stats['link_status']}</td>"
-                html += f"<td>{stats['rx_packets']}</td><td>{stats['tx_packets']}</td></tr>"
-            html += "</table>"
+            parts = [
+                "<html><head><title>Switch Simulator Report</title></head><body>",
+                f"<h1>Switch Report: {report_data['switch_info']['hostname']}</h1>",
+                f"<p>Generated at: {report_data['generated_at']}</p>",
+                "<h2>Port Statistics</h2>",
+                "<table border='1'><tr><th>Port</th><th>Status</th><th>RX Packets</th><th>TX Packets</th></tr>",
+            ]
+            parts.extend(_HTML_PORT_ROW(port_id, stats) for port_id, stats in port_stats.items())
+            parts.append("</table>")
             
             # Add other sections...
-            html += "</body></html>"
-            return html
+            parts.append("</body></html>")
+            return "".join(parts)
         else:
             # Default text format
             lines = [
@@ -388,17 +677,11 @@ class StatsViewer:
                 "Port Statistics:",
             ]
             
-            for port_id, stats in port_stats.items():
-                lines.append(f"  Port {port_id}: {stats['link_status']}, "
-                            f"RX: {stats['rx_packets']} packets, "
-                            f"TX: {stats['tx_packets']} packets")
+            lines.extend(_TEXT_PORT_ROW(port_id, stats) for port_id, stats in port_stats.items())
             
             lines.append("")
             lines.append("VLAN Statistics:")
-            for vlan_id, stats in vlan_stats.items():
-                lines.append(f"  VLAN {vlan_id} ({stats['name']}): "
-                            f"{stats['port_count']} ports, "
-                            f"{stats['mac_address_count']} MAC addresses")
+            lines.extend(_TEXT_VLAN_ROW(vlan_id, stats) for vlan_id, stats in vlan_stats.items())
             
             # Add other sections...
             
@@ -6,31 +6,44 @@ including port configuration, VLAN setup, and routing table management.
 """
 
 import os
-import sys
+import types
 import ctypes
+import functools
 import logging
-from enum import Enum, auto
-from typing import Dict, List, Optional, Tuple, Union, Any
+from pathlib import Path
+from enum import Enum, IntEnum, auto
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-# Add the parent directory to sys.path to access C library
-sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Logging is configured by the application (e.g. the CLI), not by the library
 logger = logging.getLogger(__name__)
 
-# Load the C library
+# Load the C library once per process. RTLD_NOW resolves all symbols at load
+# time instead of stalling on lazy binding at the first call of each function.
+_lib_path = Path(__file__).resolve().parents[2] / 'build' / 'libswitch_simulator.so'
 try:
-    _lib_path = os.path.join(os.path.dirname(__file__), '../../build/libswitch_simulator.so')
-    _switch_lib = ctypes.CDLL(_lib_path)
-    logger.info(f"Successfully loaded switch simulator library from {_lib_path}")
+    _switch_lib = ctypes.CDLL(str(_lib_path), mode=os.RTLD_NOW)
+    logger.info("Successfully loaded switch simulator library from %s", _lib_path)
 except OSError as e:
-    logger.error(f"Failed to load switch simulator library: {e}")
+    logger.error("Failed to load switch simulator library: %s", e)
     raise RuntimeError(f"Could not load simulator library. Have you built the project? Error: {e}")
 
+# Shared NULL string argument and cached encoder for C string parameters
+_NULL_CSTR = ctypes.c_char_p(None)
+_encode_utf8 = functools.lru_cache(maxsize=128)(str.encode)
+
+# Placeholder statistics returned until the C library provides real counters
+_ZERO_PORT_STATS = {
+    "rx_packets": 0,
+    "tx_packets": 0,
+    "rx_bytes": 0,
+    "tx_bytes": 0,
+    "rx_errors": 0,
+    "tx_errors": 0,
+    "rx_dropped": 0,
+    "tx_dropped": 0,
+    "link_status": "up"
+}
+
 
 class SwitchStatus(Enum):
     """Status codes for switch operations"""
@@ -43,7 +56,7 @@ class SwitchStatus(Enum):
     NOT_IMPLEMENTED = auto()
 
 
-class PortSpeed(Enum):
+class PortSpeed(IntEnum):
     """Available port speeds in Mbps"""
     SPEED_10 = 10
     SPEED_100 = 100
@@ -54,12 +67,80 @@ class PortSpeed(Enum):
     SPEED_100000 = 100000
 
 
-class PortDuplex(Enum):
+class PortDuplex(IntEnum):
     """Port duplex settings"""
     HALF = 0
     FULL = 1
 
 
+class PortStats(ctypes.Structure):
+    """Port statistics record as exported by the C library"""
+    _fields_ = [
+        ("rx_packets", ctypes.c_uint64),
+        ("tx_packets", ctypes.c_uint64),
+        ("rx_bytes", ctypes.c_uint64),
+        ("tx_bytes", ctypes.c_uint64),
+        ("rx_errors", ctypes.c_uint64),
+        ("tx_errors", ctypes.c_uint64),
+        ("rx_dropped", ctypes.c_uint64),
+        ("tx_dropped", ctypes.c_uint64),
+        ("link_status", ctypes.c_uint8),
+    ]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the record to a statistics dictionary"""
+        return {
+            "rx_packets": self.rx_packets,
+            "tx_packets": self.tx_packets,
+            "rx_bytes": self.rx_bytes,
+            "tx_bytes": self.tx_bytes,
+            "rx_errors": self.rx_errors,
+            "tx_errors": self.tx_errors,
+            "rx_dropped": self.rx_dropped,
+            "tx_dropped": self.tx_dropped,
+            "link_status": "up" if self.link_status else "down"
+        }
+
+
+def _configure_function_signatures(lib: ctypes.CDLL):
+    """Configure the signatures for C library functions"""
+    # Initialize switch
+    lib.switch_initialize.argtypes = [ctypes.c_int]
+    lib.switch_initialize.restype = ctypes.c_int
+    
+    # Port functions
+    lib.set_port_status.argtypes = [ctypes.c_int, ctypes.c_bool]
+    lib.set_port_status.restype = ctypes.c_int
+    
+    lib.configure_port.argtypes = [
+        ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_char_p
+    ]
+    lib.configure_port.restype = ctypes.c_int
+    
+    # VLAN functions
+    lib.create_vlan.argtypes = [ctypes.c_int, ctypes.c_char_p]
+    lib.create_vlan.restype = ctypes.c_int
+    
+    lib.add_port_to_vlan.argtypes = [
+        ctypes.c_int, ctypes.c_int, ctypes.c_bool
+    ]
+    lib.add_port_to_vlan.restype = ctypes.c_int
+    
+    # Statistics functions (bulk export is optional in older library builds)
+    if hasattr(lib, 'get_all_port_stats'):
+        lib.get_all_port_stats.argtypes = [
+            ctypes.POINTER(PortStats), ctypes.c_int
+        ]
+        lib.get_all_port_stats.restype = ctypes.c_int
+    
+    # Other functions will be added as needed
+
+
+# Signatures are set on the shared library handle once per process, and on
+# handles provided by subclasses when they are instantiated
+_configure_function_signatures(_switch_lib)
+
+
 class SwitchInterface:
     """Represents a single interface on the switch"""
     
@@ -133,6 +214,17 @@ class SwitchConfig:
 class SwitchController:
     """Main controller class for interacting with the switch simulator"""
     
+    # Methods that initialize the switch on first use. Until initialize()
+    # succeeds they are shadowed by per-instance stubs, so the methods
+    # themselves don't need to check the initialization state on every call.
+    _LAZY_INIT_METHODS = (
+        'get_interface', 'get_all_interfaces',
+        'set_port_status', 'configure_port',
+        'get_port_statistics', 'get_all_port_statistics',
+        'create_vlan', 'delete_vlan', 'add_port_to_vlan', 'remove_port_from_vlan',
+        'add_static_route', 'delete_static_route', 'get_routing_table',
+    )
+    
     def __init__(self, config: Optional[SwitchConfig] = None):
         """
         Initialize the switch controller
@@ -142,39 +234,43 @@ class SwitchController:
         """
         self.config = config or SwitchConfig()
         self._interfaces = {}
+        self._interfaces_cache: Optional[Tuple['SwitchInterface', ...]] = None
         self._initialized = False
+        self._port_stats_buffer = None
         
-        # Define C function signatures
-        self._configure_function_signatures()
-    
-    def _configure_function_signatures(self):
-        """Configure the signatures for C library functions"""
+        # Use the process-wide library handle unless a subclass provides its own
         if not hasattr(self, '_switch_lib'):
             self._switch_lib = _switch_lib
+        elif self._switch_lib is not _switch_lib:
+            _configure_function_signatures(self._switch_lib)
+        self._has_bulk_port_stats = hasattr(self._switch_lib, 'get_all_port_stats')
         
-        # Initialize switch
-        self._switch_lib.switch_initialize.argtypes = [ctypes.c_int]
-        self._switch_lib.switch_initialize.restype = ctypes.c_int
-        
-        # Port functions
-        self._switch_lib.set_port_status.argtypes = [ctypes.c_int, ctypes.c_bool]
-        self._switch_lib.set_port_status.restype = ctypes.c_int
-        
-        self._switch_lib.configure_port.argtypes = [
-            ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_char_p
-        ]
-        self._switch_lib.configure_port.restype = ctypes.c_int
-        
-        # VLAN functions
-        self._switch_lib.create_vlan.argtypes = [ctypes.c_int, ctypes.c_char_p]
-        self._switch_lib.create_vlan.restype = ctypes.c_int
-        
-        self._switch_lib.add_port_to_vlan.argtypes = [
-            ctypes.c_int, ctypes.c_int, ctypes.c_bool
-        ]
-        self._switch_lib.add_port_to_vlan.restype = ctypes.c_int
+        self._install_init_stubs()
+    
+    def _install_init_stubs(self):
+        """Route lazily initialized methods through a one-shot initialization stub"""
+        for name in self._LAZY_INIT_METHODS:
+            setattr(self, name, types.MethodType(self._make_init_stub(getattr(type(self), name)), self))
+    
+    def _remove_init_stubs(self):
+        """Expose the class methods directly once the switch is initialized"""
+        for name in self._LAZY_INIT_METHODS:
+            self.__dict__.pop(name, None)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _make_init_stub(method: Callable) -> Callable:
+        """
+        Create a stub that initializes the switch before calling method
         
-        # Other functions will be added as needed
+        The stub takes the controller as its first argument and is shared by
+        all instances, each binding it to itself.
+        """
+        @functools.wraps(method)
+        def stub(self, *args, **kwargs):
+            self.initialize()
+            return method(self, *args, **kwargs)
+        return stub
     
     def initialize(self) -> SwitchStatus:
         """Initialize the switch simulator"""
@@ -185,15 +281,17 @@ class SwitchController:
         result = self._switch_lib.switch_initialize(self.config.num_ports)
         if result == 0:
             self._initialized = True
+            self._remove_init_stubs()
             
             # Create interface objects
             for port_id in range(1, self.config.num_ports + 1):
                 self._interfaces[port_id] = SwitchInterface(port_id, self)
+            self._interfaces_cache = tuple(self._interfaces.values())
             
-            logger.info(f"Switch initialized with {self.config.num_ports} ports")
+            logger.info("Switch initialized with %d ports", self.config.num_ports)
             return SwitchStatus.OK
         else:
-            logger.error(f"Failed to initialize switch: error code {result}")
+            logger.error("Failed to initialize switch: error code %d", result)
             return SwitchStatus.ERROR
     
     def shutdown(self) -> SwitchStatus:
@@ -205,42 +303,35 @@ class SwitchController:
         result = self._switch_lib.switch_shutdown()
         if result == 0:
             self._initialized = False
+            self._install_init_stubs()
             logger.info("Switch shut down")
             return SwitchStatus.OK
         else:
-            logger.error(f"Failed to shut down switch: error code {result}")
+            logger.error("Failed to shut down switch: error code %d", result)
             return SwitchStatus.ERROR
     
     def get_interface(self, port_id: int) -> SwitchInterface:
         """Get interface object by port ID"""
-        if not self._initialized:
-            self.initialize()
-        
         if port_id not in self._interfaces:
             raise ValueError(f"Invalid port ID: {port_id}")
         
         return self._interfaces[port_id]
     
-    def get_all_interfaces(self) -> List[SwitchInterface]:
+    def get_all_interfaces(self) -> Tuple[SwitchInterface, ...]:
         """Get all interfaces"""
-        if not self._initialized:
-            self.initialize()
-        
-        return list(self._interfaces.values())
+        return self._interfaces_cache or ()
     
     # Port configuration methods
     def set_port_status(self, port_id: int, enabled: bool) -> SwitchStatus:
         """Set port status (enabled/disabled)"""
-        if not self._initialized:
-            self.initialize()
-        
         result = self._switch_lib.set_port_status(port_id, enabled)
         status = SwitchStatus.OK if result == 0 else SwitchStatus.ERROR
         
         if status == SwitchStatus.OK:
-            logger.info(f"Port {port_id} {'enabled' if enabled else 'disabled'}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Port %d %s", port_id, 'enabled' if enabled else 'disabled')
         else:
-            logger.error(f"Failed to set port {port_id} status: error code {result}")
+            logger.error("Failed to set port %d status: error code %d", port_id, result)
         
         return status
     
@@ -248,101 +339,94 @@ class SwitchController:
                       duplex: Optional[PortDuplex] = None, 
                       description: Optional[str] = None) -> SwitchStatus:
         """Configure port parameters"""
-        if not self._initialized:
-            self.initialize()
-        
-        speed_val = speed.value if speed else 0
-        duplex_val = duplex.value if duplex else 0
-        desc_str = description.encode('utf-8') if description else ctypes.c_char_p(0)
+        # IntEnum members are passed to ctypes as plain integers
+        speed_val = speed or 0
+        duplex_val = duplex or 0
+        desc_str = _encode_utf8(description) if description else _NULL_CSTR
         
         result = self._switch_lib.configure_port(port_id, speed_val, duplex_val, desc_str)
         status = SwitchStatus.OK if result == 0 else SwitchStatus.ERROR
         
         if status == SwitchStatus.OK:
-            logger.info(f"Configured port {port_id}")
+            logger.info("Configured port %d", port_id)
         else:
-            logger.error(f"Failed to configure port {port_id}: error code {result}")
+            logger.error("Failed to configure port %d: error code %d", port_id, result)
         
         return status
     
     def get_port_statistics(self, port_id: int) -> Dict[str, Any]:
         """Get port statistics"""
-        if not self._initialized:
-            self.initialize()
-        
         # This would typically call into the C library to get statistics
-        # For now, we'll return a placeholder dictionary
-        return {
-            "rx_packets": 0,
-            "tx_packets": 0,
-            "rx_bytes": 0,
-            "tx_bytes": 0,
-            "rx_errors": 0,
-            "tx_errors": 0,
-            "rx_dropped": 0,
-            "tx_dropped": 0,
-            "link_status": "up"
-        }
+        # For now, we'll return a copy of the placeholder dictionary
+        return _ZERO_PORT_STATS.copy()
+    
+    def get_all_port_statistics(self) -> Dict[int, Dict[str, Any]]:
+        """Get statistics for all ports with a single library call"""
+        if not self._has_bulk_port_stats:
+            return {port_id: self.get_port_statistics(port_id) for port_id in self._interfaces}
+        
+        num_ports = self.config.num_ports
+        if self._port_stats_buffer is None or len(self._port_stats_buffer) != num_ports:
+            self._port_stats_buffer = (PortStats * num_ports)()
+        
+        result = self._switch_lib.get_all_port_stats(self._port_stats_buffer, num_ports)
+        if result != 0:
+            logger.error("Failed to get port statistics: error code %d", result)
+            return {}
+        
+        return {port_id: stats.to_dict()
+                for port_id, stats in enumerate(self._port_stats_buffer, start=1)}
     
     # VLAN methods
     def create_vlan(self, vlan_id: int, name: Optional[str] = None) -> SwitchStatus:
         """Create a new VLAN"""
-        if not self._initialized:
-            self.initialize()
-        
-        name_str = name.encode('utf-8') if name else ctypes.c_char_p(0)
+        name_str = _encode_utf8(name) if name else _NULL_CSTR
         result = self._switch_lib.create_vlan(vlan_id, name_str)
         status = SwitchStatus.OK if result == 0 else SwitchStatus.ERROR
         
         if status == SwitchStatus.OK:
-            logger.info(f"Created VLAN {vlan_id}{f' ({name})' if name else ''}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Created VLAN %d%s", vlan_id, f" ({name})" if name else "")
         else:
-            logger.error(f"Failed to create VLAN {vlan_id}: error code {result}")
+            logger.error("Failed to create VLAN %d: error code %d", vlan_id, result)
         
         return status
     
     def delete_vlan(self, vlan_id: int) -> SwitchStatus:
         """Delete a VLAN"""
-        if not self._initialized:
-            self.initialize()
-        
         result = self._switch_lib.delete_vlan(vlan_id)
         status = SwitchStatus.OK if result == 0 else SwitchStatus.ERROR
         
         if status == SwitchStatus.OK:
-            logger.info(f"Deleted VLAN {vlan_id}")
+            logger.info("Deleted VLAN %d", vlan_id)
         else:
-            logger.error(f"Failed to delete VLAN {vlan_id}: error code {result}")
+            logger.error("Failed to delete VLAN %d: error code %d", vlan_id, result)
         
         return status
     
     def add_port_to_vlan(self, port_id: int, vlan_id: int, tagged: bool = False) -> SwitchStatus:
         """Add a port to a VLAN"""
-        if not self._initialized:
-            self.initialize()
-        
         result = self._switch_lib.add_port_to_vlan(port_id, vlan_id, tagged)
         status = SwitchStatus.OK if result == 0 else SwitchStatus.ERROR
         
         if status == SwitchStatus.OK:
-            logger.info(f"Added port {port_id} to VLAN {vlan_id} ({'tagged' if tagged else 'untagged'})")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Added port %d to VLAN %d (%s)", port_id, vlan_id,
+                            'tagged' if tagged else 'untagged')
         else:
-            logger.error(f"Failed to add port {port_id} to VLAN {vlan_id}: error code {result}")
+            logger.error("Failed to add port %d to VLAN %d: error code %d", port_id, vlan_id, result)
         
         return status
     
     def remove_port_from_vlan(self, port_id: int, vlan_id: int) -> SwitchStatus:
         """Remove a port from a VLAN"""
-        if not self._initialized:
-            self.initialize()
-        
         result = self._switch_lib.remove_port_from_vlan(port_id, vlan_id)
         status = SwitchStatus.OK if result == 0 else SwitchStatus.ERROR
         
         if status == SwitchStatus.OK:
-            logger.info(f"Removed port {port_id} from VLAN {vlan_id}")
+            logger.info("Removed port %d from VLAN %d", port_id, vlan_id)
         else:
-            logger.error(f"Failed to remove port {port_id} from VLAN {vlan_id}: error code {result}")
+            logger.error("Failed to remove port %d from VLAN %d: error code %d", port_id, vlan_id, result)
         
         return status
     
@@ -350,30 +434,22 @@ class SwitchController:
     def add_static_route(self, network: str, netmask: str, next_hop: str, 
                          interface: Optional[int] = None) -> SwitchStatus:
         """Add a static route"""
-        if not self._initialized:
-            self.initialize()
-        
         # Implementation would call into C library
         # This is a placeholder
-        logger.info(f"Added static route to {network}/{netmask} via {next_hop}" + 
-                    (f" on interface {interface}" if interface else ""))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Added static route to %s/%s via %s%s", network, netmask, next_hop,
+                        f" on interface {interface}" if interface else "")
         return SwitchStatus.OK
     
     def delete_static_route(self, network: str, netmask: str) -> SwitchStatus:
         """Delete a static route"""
-        if not self._initialized:
-            self.initialize()
-        
         # Implementation would call into C library
         # This is a placeholder
-        logger.info(f"Deleted static route to {network}/{netmask}")
+        logger.info("Deleted static route to %s/%s", network, netmask)
         return SwitchStatus.OK
     
     def get_routing_table(self) -> List[Dict[str, Any]]:
         """Get the current routing table"""
-        if not self._initialized:
-            self.initialize()
-        
         # This would typically call into the C library to get the routing table
         # For now, we'll return a placeholder list
         return [
@@ -6,12 +6,16 @@ It sets up the command parser, handles input/output, and manages the
 command loop.
 """
 
+import io
 import os
 import sys
 import signal
 import logging
 import argparse
 import readline
+import tempfile
+import threading
+import contextlib
 from typing import List, Optional
 
 # Configure logging
@@ -32,12 +36,70 @@ try:
     from api.switch_controller import SwitchController, SwitchConfig
     from api.stats_viewer import StatsViewer
 except ImportError as e:
-    logger.error(f"Failed to import API modules: {e}")
+    logger.error("Failed to import API modules: %s", e)
     logger.error("Make sure the api/ directory is properly implemented")
     api_available = False
 else:
     api_available = True
 
+# Number of history entries kept in memory and on disk
+HISTORY_LENGTH = 1000
+
+# History files larger than this are read from their tail only
+HISTORY_TAIL_THRESHOLD = 256 * 1024
+
+# Header line written by libedit-based readline implementations
+LIBEDIT_HISTORY_HEADER = b"_HiStOrY_V2_"
+
+
+def _read_tail_lines(path: str, max_lines: int, chunk_size: int = 8192) -> bytes:
+    """
+    Read the last lines of a file without reading the whole file
+    
+    Args:
+        path: Path to the file
+        max_lines: Maximum number of lines to return
+        chunk_size: Size of the chunks read backwards from the end of the file
+        
+    Returns:
+        The last max_lines lines of the file
+    """
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b""
+        while pos > 0 and data.count(b"\n") <= max_lines:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    
+    lines = data.splitlines(keepends=True)
+    if pos > 0:
+        lines = lines[1:]  # The first line may be cut off
+    return b"".join(lines[-max_lines:])
+
+
+@contextlib.contextmanager
+def _buffered_stdout():
+    """Block-buffer sys.stdout, even when it is a terminal, until the block exits"""
+    stdout = sys.stdout
+    buffer = getattr(stdout, 'buffer', None)
+    if buffer is None:
+        # Already replaced by something that is not a text file
+        yield
+        return
+    
+    stdout.flush()
+    wrapper = io.TextIOWrapper(buffer, encoding=stdout.encoding, errors=stdout.errors,
+                               line_buffering=False, write_through=False)
+    sys.stdout = wrapper
+    try:
+        yield
+    finally:
+        wrapper.flush()
+        wrapper.detach()  # Leave the underlying buffer open
+        sys.stdout = stdout
+
 
 class CLI:
     """Main CLI application class"""
@@ -57,33 +119,53 @@ class CLI:
         self.history_file = history_file or os.path.expanduser("~/.switch_cli_history")
         self.running = False
         
-        # Set up command history
-        self._setup_history()
-        
-        # Set up signal handlers
-        signal.signal(signal.SIGINT, self._handle_interrupt)
+        # Completions for the last Tab press, reused while the line is unchanged
+        self._completion_key = None
+        self._completion_options = []
     
-    def _setup_history(self):
-        """Set up command history handling"""
-        # Ensure history file exists
-        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-        
+    def _load_history(self):
+        """Load command history for the interactive session"""
         try:
-            if not os.path.exists(self.history_file):
-                with open(self.history_file, 'w'):
-                    pass
-            
-            readline.read_history_file(self.history_file)
-            readline.set_history_length(1000)
+            readline.set_history_length(HISTORY_LENGTH)
+            if os.path.getsize(self.history_file) > HISTORY_TAIL_THRESHOLD:
+                self._load_history_tail()
+            else:
+                readline.read_history_file(self.history_file)
+        except FileNotFoundError:
+            # No history yet, the file is created on the first save
+            pass
         except (IOError, OSError) as e:
-            logger.warning(f"Could not read history file: {e}")
+            logger.warning("Could not read history file: %s", e)
+    
+    def _load_history_tail(self):
+        """Load only the most recent entries of a large history file"""
+        with open(self.history_file, 'rb') as f:
+            header = f.readline()
+        
+        tail = _read_tail_lines(self.history_file, HISTORY_LENGTH)
+        with tempfile.NamedTemporaryFile('wb', suffix='.history', delete=False) as tmp:
+            if header.startswith(LIBEDIT_HISTORY_HEADER) and not tail.startswith(header):
+                tmp.write(header)
+            tmp.write(tail)
+        
+        try:
+            readline.read_history_file(tmp.name)
+        finally:
+            os.unlink(tmp.name)
     
     def _save_history(self):
         """Save command history to file"""
+        # History is only loaded, and therefore only saved, by the interactive loop
+        if not self.running:
+            return
+        
         try:
+            history_dir = os.path.dirname(self.history_file)
+            if history_dir:
+                os.makedirs(history_dir, exist_ok=True)
             readline.write_history_file(self.history_file)
         except (IOError, OSError) as e:
-            logger.warning(f"Could not write history file: {e}")
+            logger.warning("Could not write history file: %s", e)
     
     def _handle_interrupt(self, signum, frame):
         """Handle keyboard interrupt"""
@@ -107,13 +189,22 @@ class CLI:
         
         def completer(text, state):
             """Tab completion function for readline"""
-            # Get completion options from the parser
-            options = self.parser.autocomplete(text)
+            # readline calls this once per state on every Tab press: only ask
+            # the parser on the first call, and not at all for a second Tab
+            # on an unchanged line (which just lists the same matches)
+            if state == 0:
+                key = (readline.get_line_buffer(), text, self.context.mode)
+                if key != self._completion_key:
+                    self._completion_key = key
+                    self._completion_options = self.parser.autocomplete(text)
+            
+            options = self._completion_options
             if state < len(options):
                 return options[state]
             return None
         
         readline.set_completer(completer)
+        # First Tab inserts the common prefix, a second Tab lists the matches
         readline.parse_and_bind("tab: complete")
     
     def run(self):
@@ -126,19 +217,41 @@ class CLI:
         print("Type 'help' for a list of commands, or 'exit' to quit")
         
         self.running = True
+        self._load_history()
         self._setup_autocompletion()
         
+        # Ctrl-C only prints a hint while the interactive loop runs; signal
+        # handlers can only be installed from the main thread
+        old_handler = None
+        if threading.current_thread() is threading.main_thread():
+            old_handler = signal.signal(signal.SIGINT, self._handle_interrupt)
+        
+        try:
+            self._command_loop()
+        except Exception:
+            logger.exception("Unexpected error in the command loop")
+            raise
+        finally:
+            if old_handler is not None:
+                signal.signal(signal.SIGINT, old_handler)
+        
+        print("Goodbye!")
+        self._save_history()
+        return 0
+    
+    def _command_loop(self):
+        """Read and execute commands until the user exits"""
         while self.running:
             try:
-                command = self._get_input()
+                command = self._get_input().strip()
                 
                 # Skip empty commands
-                if not command.strip():
+                if not command:
                     continue
                 
                 # Handle help command separately
-                if command.strip().lower().startswith("help"):
-                    args = command.strip().split(maxsplit=1)
+                if command[:4].lower() == "help" and (len(command) == 4 or command[4].isspace()):
+                    args = command.split(maxsplit=1)
                     if len(args) > 1:
                         result = self.parser.get_command_help(args[1])
                     else:
@@ -154,13 +267,9 @@ class CLI:
                 if not result.success and result.message == "exit":
                     break
                 
-            except Exception as e:
-                logger.error(f"Unhandled exception: {e}")
+            except (ValueError, KeyError, AttributeError, OSError) as e:
+                logger.error("Unhandled exception: %s", e)
                 print(f"Error: {e}")
-        
-        print("Goodbye!")
-        self._save_history()
-        return 0
 
 
 def parse_arguments():
@@ -192,13 +301,13 @@ def main():
             config = SwitchConfig()
             if args.config:
                 # TODO: Implement configuration loading
-                logger.info(f"Loading configuration from {args.config}")
+                logger.info("Loading configuration from %s", args.config)
             
             controller = SwitchController(config)
             controller.initialize()
             logger.info("Initialized switch controller")
         except Exception as e:
-            logger.error(f"Failed to initialize switch controller: {e}")
+            logger.error("Failed to initialize switch controller: %s", e)
             print(f"Error initializing switch controller: {e}")
             return 1
     else:
@@ -208,22 +317,25 @@ def main():
     cli = CLI(controller)
     
     if args.batch:
-        # Execute batch commands from file
+        # Execute batch commands from file, without readline and with
+        # output written in blocks rather than line by line
         try:
             with open(args.batch, 'r') as batch_file:
-                for line in batch_file:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        print(f"{cli.context.get_prompt()}{line}")
-                        result = cli.parser.parse_and_execute(line)
-                        cli._display_result(result)
-                        
-                        # Check for exit command
-                        if not result.success and result.message == "exit":
-                            break
+                lines = (line.strip() for line in batch_file.read().splitlines())
+                commands = [line for line in lines if line and not line.startswith('#')]
+            
+            with _buffered_stdout():
+                for line in commands:
+                    print(f"{cli.context.get_prompt()}{line}")
+                    result = cli.parser.parse_and_execute(line)
+                    cli._display_result(result)
+                    
+                    # Check for exit command
+                    if not result.success and result.message == "exit":
+                        break
             return 0
         except (IOError, OSError) as e:
-            logger.error(f"Failed to read batch file: {e}")
+            logger.error("Failed to read batch file: %s", e)
             print(f"Error reading batch file: {e}")
             return 1
     else:
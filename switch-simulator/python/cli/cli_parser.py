@@ -10,8 +10,8 @@ import sys
 import re
 import logging
 import inspect
-import importlib
-from typing import Dict, List, Callable, Any, Optional, Tuple
+import collections
+from typing import Dict, List, Callable, Any, Optional, Pattern, Tuple
 from enum import Enum
 
 # Configure logging
@@ -24,6 +24,41 @@ logger = logging.getLogger(__name__)
 # Add parent directory to sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
+# Literal leading word of a command pattern, e.g. "show" in r'^show port (\d+)$'.
+# Only matches when the word cannot run into a longer token in the input.
+_FIRST_TOKEN_RE = re.compile(r'\^?([A-Za-z0-9_-]+)(?:(?: |\\s)(?![*?{])|\$)')
+
+# Built-in commands that leave the current mode or the CLI
+_EXIT_WORDS = frozenset({"exit", "quit"})
+
+# Maximum number of user-defined variables kept by a CommandContext
+MAX_VARIABLES = 1024
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Check whether a regex has an unescaped | outside any group or character class"""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 1  # Skip the escaped character
+        elif char == '[':
+            # A ] right after [ or [^ is a literal member of the class
+            i += 2 if pattern.startswith('^', i + 1) else 1
+            if pattern.startswith(']', i):
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth <= 0:
+            return True
+        i += 1
+    return False
+
 
 class CommandContext:
     """Context object passed to command handlers"""
@@ -40,11 +75,28 @@ class CommandContext:
         self.mode = "global"  # Could be "global", "interface", "vlan", etc.
         self.current_interface = None
         self.current_vlan = None
-        self.variables = {}  # For user-defined variables
+        self.variables = collections.OrderedDict()  # For user-defined variables, see set_variable()
+        self._prompt_key = None
+        self._prompt_cache = None
+    
+    def set_variable(self, name: str, value: Any):
+        """
+        Set a user-defined variable, evicting the least recently set ones
+        once more than MAX_VARIABLES are stored
+        
+        Args:
+            name: Variable name
+            value: Variable value
+        """
+        self.variables.pop(name, None)
+        self.variables[name] = value
+        while len(self.variables) > MAX_VARIABLES:
+            self.variables.popitem(last=False)
     
     def set_mode(self, mode: str, context_obj=None):
         """Set the current CLI mode"""
         self.mode = mode
+        self._prompt_key = None
         
         if mode == "interface" and context_obj is not None:
             self.current_interface = context_obj
@@ -62,6 +114,14 @@ class CommandContext:
         if self.switch_controller:
             hostname = getattr(self.switch_controller.config, "hostname", "switch")
         
+        key = (self.mode, id(self.current_interface), id(self.current_vlan), hostname)
+        if key != self._prompt_key:
+            self._prompt_cache = self._format_prompt(hostname)
+            self._prompt_key = key
+        return self._prompt_cache
+    
+    def _format_prompt(self, hostname: str) -> str:
+        """Format the prompt for the current mode"""
         if self.mode == "global":
             return f"{hostname}# "
         elif self.mode == "interface" and self.current_interface:
@@ -96,8 +156,13 @@ class CommandHandler:
     """Decorator and registry for command handlers"""
     
     _commands = {}
+    _compiled = {}
     _help_text = {}
     _mode_restrictions = {}
+    _by_first_token = None  # Built lazily by get_dispatch_candidates()
+    _unindexed = None
+    _mode_index = {}  # mode -> patterns valid in it, filled by get_patterns_for_mode()
+    _autocomplete_prefix = {}  # pattern -> (base command, lowercased base command)
     
     @classmethod
     def register(cls, command_pattern: str, help_text: str = "", modes: List[str] = None):
@@ -114,8 +179,21 @@ class CommandHandler:
         
         def decorator(func):
             cls._commands[command_pattern] = func
+            cls._compiled[command_pattern] = re.compile(command_pattern, re.IGNORECASE)
             cls._help_text[command_pattern] = help_text
             cls._mode_restrictions[command_pattern] = modes
+            
+            # Convert regex pattern to a prefix if possible
+            if command_pattern.startswith('^'):
+                # Remove regex components to get a base command
+                base_cmd = re.sub(r'\([^)]*\)', '', command_pattern[1:])
+                base_cmd = re.sub(r'[\$\^\*\+\?\[\]\{\}]', '', base_cmd)
+                cls._autocomplete_prefix[command_pattern] = (base_cmd, base_cmd.lower())
+            else:
+                cls._autocomplete_prefix.pop(command_pattern, None)
+            
+            cls._by_first_token = None
+            cls._mode_index.clear()
             return func
         
         return decorator
@@ -125,6 +203,50 @@ class CommandHandler:
         """Get all registered commands"""
         return cls._commands
     
+    @classmethod
+    def get_compiled_patterns(cls) -> Dict[str, Pattern]:
+        """Get the compiled regex of every registered command pattern"""
+        return cls._compiled
+    
+    @classmethod
+    def _build_dispatch_index(cls):
+        """Bucket registered patterns by their literal first token"""
+        by_first_token = {}
+        unindexed = []
+        for seq, (pattern, handler) in enumerate(cls._commands.items()):
+            entry = (seq, pattern, cls._compiled[pattern], handler)
+            # A branch of a top-level alternation may start with any token
+            token_match = None if _has_top_level_alternation(pattern) else _FIRST_TOKEN_RE.match(pattern)
+            if token_match:
+                by_first_token.setdefault(token_match.group(1).lower(), []).append(entry)
+            else:
+                unindexed.append(entry)
+        cls._by_first_token = by_first_token
+        cls._unindexed = unindexed
+    
+    @classmethod
+    def get_dispatch_candidates(cls, command_str: str) -> List[Tuple[int, str, Pattern, Callable]]:
+        """
+        Get the commands that could match a command string
+        
+        Args:
+            command_str: Stripped, non-empty command string
+            
+        Returns:
+            List of (registration order, pattern, compiled regex, handler)
+            tuples in registration order
+        """
+        if cls._by_first_token is None:
+            cls._build_dispatch_index()
+        
+        first_token = command_str.split(None, 1)[0].lower()
+        bucket = cls._by_first_token.get(first_token)
+        if not bucket:
+            return cls._unindexed
+        if not cls._unindexed:
+            return bucket
+        return sorted(bucket + cls._unindexed)
+    
     @classmethod
     def get_help(cls, command_pattern: str = None) -> Dict[str, str]:
         """
@@ -142,6 +264,40 @@ class CommandHandler:
             return {}
         return cls._help_text
     
+    @classmethod
+    def get_autocomplete_prefix(cls, command_pattern: str) -> Optional[Tuple[str, str]]:
+        """
+        Get the literal base command derived from a pattern
+        
+        Args:
+            command_pattern: The command pattern
+            
+        Returns:
+            (base command, lowercased base command), or None if the pattern
+            is not anchored and cannot be completed
+        """
+        return cls._autocomplete_prefix.get(command_pattern)
+    
+    @classmethod
+    def get_patterns_for_mode(cls, mode: str) -> List[str]:
+        """
+        Get the patterns of all commands valid in a mode
+        
+        Args:
+            mode: The CLI mode
+            
+        Returns:
+            List of command patterns in registration order
+        """
+        patterns = cls._mode_index.get(mode)
+        if patterns is None:
+            patterns = [
+                pattern for pattern, valid_modes in cls._mode_restrictions.items()
+                if mode in valid_modes or "all" in valid_modes
+            ]
+            cls._mode_index[mode] = patterns
+        return patterns
+    
     @classmethod
     def is_valid_in_mode(cls, command_pattern: str, mode: str) -> bool:
         """
@@ -175,24 +331,12 @@ class CommandParser:
         self._load_command_modules()
     
     def _load_command_modules(self):
-        """Load all command modules from the commands directory"""
-        commands_dir = os.path.join(os.path.dirname(__file__), "commands")
-        
-        # Ensure __init__.py exists
-        init_path = os.path.join(commands_dir, "__init__.py")
-        if not os.path.exists(init_path):
-            logger.warning(f"Missing __init__.py in {commands_dir}")
-            return
-        
-        # Import all python files in the commands directory
-        for filename in os.listdir(commands_dir):
-            if filename.endswith(".py") and filename != "__init__.py":
-                module_name = filename[:-3]  # Remove .py extension
-                try:
-                    importlib.import_module(f".commands.{module_name}", package="cli")
-                    logger.debug(f"Loaded command module: {module_name}")
-                except ImportError as e:
-                    logger.error(f"Failed to load command module {module_name}: {e}")
+        """Load the command modules listed in the commands package"""
+        # The package imports every command module, registering their commands
+        try:
+            from . import commands  # noqa: F401
+        except ImportError as e:
+            logger.error("Failed to load command modules: %s", e)
     
     def parse_and_execute(self, command_str: str) -> CommandResult:
         """
@@ -209,8 +353,10 @@ class CommandParser:
         if not command_str:
             return CommandResult(True, "")
         
+        command_lower = command_str.lower()
+        
         # Handle built-in exit command
-        if command_str.lower() in ("exit", "quit"):
+        if command_lower in _EXIT_WORDS:
             if self.context.mode != "global":
                 self.context.set_mode("global")
                 return CommandResult(True, "Returned to global mode")
@@ -219,15 +365,15 @@ class CommandParser:
                 return CommandResult(False, "exit")
         
         # Handle mode-specific exit
-        if command_str.lower() == "end":
+        if command_lower == "end":
             if self.context.mode != "global":
                 self.context.set_mode("global")
                 return CommandResult(True, "Returned to global mode")
             return CommandResult(False, "Cannot use 'end' in global mode")
         
         # Find matching command
-        for pattern, handler in CommandHandler.get_commands().items():
-            match = re.match(pattern, command_str, re.IGNORECASE)
+        for _, pattern, compiled, handler in CommandHandler.get_dispatch_candidates(command_str):
+            match = compiled.match(command_str)
             if match:
                 # Check if command is valid in current mode
                 if not CommandHandler.is_valid_in_mode(pattern, self.context.mode):
@@ -245,7 +391,7 @@ class CommandParser:
                         self.context.last_result = result_obj
                         return result_obj
                 except Exception as e:
-                    logger.error(f"Error executing command {command_str!r}: {e}")
+                    logger.error("Error executing command %r: %s", command_str, e)
                     return CommandResult(False, f"Error: {e}")
                 
         return CommandResult(False, f"Unknown command: {command_str}")
@@ -262,29 +408,34 @@ class CommandParser:
         """
         if command_str:
             # Try to match against available commands
-            help_matches = {}
-            for pattern in CommandHandler.get_help():
-                if re.search(command_str, pattern, re.IGNORECASE):
-                    # Check if command is valid in current mode
-                    if CommandHandler.is_valid_in_mode(pattern, self.context.mode):
-                        help_matches[pattern] = CommandHandler.get_help()[pattern]
+            try:
+                search = re.compile(command_str, re.IGNORECASE).search
+            except re.error:
+                search = re.compile(re.escape(command_str), re.IGNORECASE).search
+            
+            help_matches = [
+                pattern for pattern in CommandHandler.get_patterns_for_mode(self.context.mode)
+                if search(pattern)
+            ]
             
             if help_matches:
                 help_text = "Available commands matching '{}' in {} mode:\n".format(
                     command_str, self.context.mode
                 )
-                for pattern, text in help_matches.items():
-                    help_text += f"  {pattern} - {text}\n"
-                return CommandResult(True, help_text)
+                return CommandResult(True, help_text + self._format_help_lines(help_matches))
             else:
                 return CommandResult(False, f"No help available for '{command_str}' in {self.context.mode} mode")
         else:
             # Show all commands valid in the current mode
             help_text = "Available commands in {} mode:\n".format(self.context.mode)
-            for pattern, text in CommandHandler.get_help().items():
-                if CommandHandler.is_valid_in_mode(pattern, self.context.mode):
-                    help_text += f"  {pattern} - {text}\n"
-            return CommandResult(True, help_text)
+            patterns = CommandHandler.get_patterns_for_mode(self.context.mode)
+            return CommandResult(True, help_text + self._format_help_lines(patterns))
+    
+    @staticmethod
+    def _format_help_lines(patterns: List[str]) -> str:
+        """Format one help line per command pattern"""
+        all_help = CommandHandler.get_help()
+        return "".join([f"  {pattern} - {all_help[pattern]}\n" for pattern in patterns])
     
     def autocomplete(self, partial_command: str) -> List[str]:
         """
@@ -296,18 +447,10 @@ class CommandParser:
         Returns:
             List of possible completions
         """
-        suggestions = []
-        
-        for pattern in CommandHandler.get_commands():
-            # Convert regex pattern to a prefix if possible
-            if pattern.startswith('^'):
-                # Remove regex components to get a base command
-                base_cmd = re.sub(r'\([^)]*\)', '', pattern[1:])
-                base_cmd = re.sub(r'[\$\^\*\+\?\[\]\{\}]', '', base_cmd)
-                
-                if base_cmd.lower().startswith(partial_command.lower()):
-                    # Only suggest commands valid in current mode
-                    if CommandHandler.is_valid_in_mode(pattern, self.context.mode):
-                        suggestions.append(base_cmd)
+        partial_lower = partial_command.lower()
+        get_prefix = CommandHandler.get_autocomplete_prefix
         
-        return suggestions
+        # Only suggest commands valid in current mode
+        prefixes = (get_prefix(pattern) for pattern in CommandHandler.get_patterns_for_mode(self.context.mode))
+        return [prefix[0] for prefix in prefixes
+                if prefix is not None and prefix[1].startswith(partial_lower)]
@@ -17,13 +17,31 @@ __all__ = [
     'register_vlan_commands'
 ]
 
-def register_all_commands(command_registry):
+# Top-level command name -> function registering it
+_COMMAND_REGISTRARS = {
+    'port': register_port_commands,
+    'routing': register_routing_commands,
+    'vlan': register_vlan_commands,
+}
+
+
+def register_all_commands(command_registry, argv=None):
     """
     Register all CLI commands with the provided command registry.
     
+    When argv is given and its first element names a top-level command,
+    only that command is registered, as argparse will not look at the
+    others. Otherwise (no command yet, -h/--help, or an unknown name, which
+    argparse reports using the full list) every command is registered.
+    
     Args:
         command_registry: The command registry to register commands with
+        argv: Optional command line arguments, without the program name
     """
-    register_port_commands(command_registry)
-    register_routing_commands(command_registry)
-    register_vlan_commands(command_registry)
+    registrar = _COMMAND_REGISTRARS.get(argv[0]) if argv else None
+    if registrar is not None:
+        registrar(command_registry)
+        return
+    
+    for registrar in _COMMAND_REGISTRARS.values():
+        registrar(command_registry)
@@ -0,0 +1,74 @@
+"""
+Lazily populated argparse subcommands.
+
+Command modules register many subcommands, but a single CLI invocation
+only runs one of them. The subparsers action defined here adds the
+subcommand parsers up front (so they still show up in help output) and
+only adds their arguments, including -h/--help, once the subcommand is
+actually selected.
+"""
+
+import argparse
+from typing import Callable
+
+
+class LazySubParsersAction(argparse._SubParsersAction):
+    """Subparsers action that builds each subcommand's arguments on first use"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._builders = {}
+    
+    def add_lazy_parser(self, name: str, builder: Callable[[argparse.ArgumentParser], None], **kwargs):
+        """
+        Add a subcommand whose arguments are added by builder when it is selected
+        
+        Args:
+            name: Subcommand name
+            builder: Function adding arguments and defaults to the subcommand parser
+            **kwargs: Passed on to add_parser (help, description, ...)
+        
+        Returns:
+            The (still empty) subcommand parser
+        """
+        add_help = kwargs.pop('add_help', True)
+        parser = self.add_parser(name, add_help=False, **kwargs)
+        self._builders[name] = (builder, add_help)
+        return parser
+    
+    def __call__(self, parser, namespace, values, option_string=None):
+        builder, add_help = self._builders.pop(values[0], (None, False))
+        if builder is not None:
+            subparser = self._name_parser_map[values[0]]
+            if add_help:
+                _add_help_argument(subparser)
+            builder(subparser)
+        super().__call__(parser, namespace, values, option_string)
+
+
+def _add_help_argument(parser: argparse.ArgumentParser):
+    """Add the -h/--help option ArgumentParser adds when created with add_help=True"""
+    prefix = '-' if '-' in parser.prefix_chars else parser.prefix_chars[0]
+    parser.add_argument(prefix + 'h', prefix * 2 + 'help', action='help', default=argparse.SUPPRESS,
+                        help='show this help message and exit')
+
+
+def add_command_parser(subparsers, name: str, builder: Callable[[argparse.ArgumentParser], None], **kwargs):
+    """
+    Add a subcommand parser, lazily if subparsers supports it
+    
+    Args:
+        subparsers: The subparsers object from argparse
+        name: Subcommand name
+        builder: Function adding arguments and defaults to the subcommand parser
+        **kwargs: Passed on to add_parser
+    
+    Returns:
+        The subcommand parser
+    """
+    if isinstance(subparsers, LazySubParsersAction):
+        return subparsers.add_lazy_parser(name, builder, **kwargs)
+    
+    command_parser = subparsers.add_parser(name, **kwargs)
+    builder(command_parser)
+    return command_parser
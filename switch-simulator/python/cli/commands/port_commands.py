@@ -5,8 +5,16 @@ This module provides commands for configuring and managing switch ports,
 including enabling/disabling ports, setting port speed, and viewing port status.
 """
 
+import sys
 import argparse
-from ...api.switch_controller import SwitchController
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ...api.switch_controller import SwitchController
+
+# Port speeds in Mbps accepted by set_port_speed, in ascending order
+_VALID_PORT_SPEEDS_SORTED = (10, 100, 1000, 10000, 25000, 40000, 100000)
+_VALID_PORT_SPEEDS = frozenset(_VALID_PORT_SPEEDS_SORTED)
 
 
 def show_port(args, switch_ctrl):
@@ -27,11 +35,12 @@ def show_port(args, switch_ctrl):
     else:
         # Show all ports
         ports = switch_ctrl.get_all_ports()
-        print("Port   Status   Speed    VLAN   MAC Address")
-        print("-----------------------------------------")
-        for port in ports:
-            print(f"{port['id']:<6} {'Up' if port['up'] else 'Down':<8} "
-                  f"{port['speed']:<8} {port['vlan']:<6} {port['mac']}")
+        lines = ["Port   Status   Speed    VLAN   MAC Address",
+                 "-----------------------------------------"]
+        lines.extend([f"{port['id']:<6} {'Up' if port['up'] else 'Down':<8} "
+                      f"{port['speed']:<8} {port['vlan']:<6} {port['mac']}" for port in ports])
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
 
 
 def set_port_status(args, switch_ctrl):
@@ -55,10 +64,8 @@ def set_port_status(args, switch_ctrl):
 
 def set_port_speed(args, switch_ctrl):
     """Set port speed"""
-    valid_speeds = [10, 100, 1000, 10000, 25000, 40000, 100000]
-    
-    if args.speed not in valid_speeds:
-        print(f"Error: Speed must be one of {valid_speeds}")
+    if args.speed not in _VALID_PORT_SPEEDS:
+        print(f"Error: Speed must be one of {list(_VALID_PORT_SPEEDS_SORTED)}")
         return
     
     try:
@@ -71,31 +78,41 @@ def set_port_speed(args, switch_ctrl):
         print(f"Error: {str(e)}")
 
 
+# Port subcommands as (name, help, handler, ((argument name, add_argument kwargs), ...))
+_PORT_SUBCOMMANDS = (
+    ('show', 'Show port information', show_port, (
+        ('port_id', dict(nargs='?', type=int, help='Port ID (optional, shows all ports if omitted)')),
+    )),
+    ('status', 'Set port status (up/down)', set_port_status, (
+        ('port_id', dict(type=int, help='Port ID')),
+        ('status', dict(choices=['up', 'down'], help='Port status')),
+    )),
+    ('speed', 'Set port speed', set_port_speed, (
+        ('port_id', dict(type=int, help='Port ID')),
+        ('speed', dict(type=int, help='Port speed in Mbps (10, 100, 1000, etc.)')),
+    )),
+)
+
+
 def register_port_commands(subparsers):
     """
     Register all port-related commands with the CLI parser
     
+    Registering with the same subparsers object again is a no-op.
+    
     Args:
         subparsers: The subparsers object from argparse to register commands with
     """
+    if 'port' in subparsers.choices:
+        return
+    
     # Create port command parser
     port_parser = subparsers.add_parser('port', help='Port configuration and management')
     port_subparsers = port_parser.add_subparsers(dest='port_command', help='Port commands')
     port_subparsers.required = True
     
-    # Show port command
-    show_parser = port_subparsers.add_parser('show', help='Show port information')
-    show_parser.add_argument('port_id', nargs='?', type=int, help='Port ID (optional, shows all ports if omitted)')
-    show_parser.set_defaults(func=show_port)
-    
-    # Set port status command
-    status_parser = port_subparsers.add_parser('status', help='Set port status (up/down)')
-    status_parser.add_argument('port_id', type=int, help='Port ID')
-    status_parser.add_argument('status', choices=['up', 'down'], help='Port status')
-    status_parser.set_defaults(func=set_port_status)
-    
-    # Set port speed command
-    speed_parser = port_subparsers.add_parser('speed', help='Set port speed')
-    speed_parser.add_argument('port_id', type=int, help='Port ID')
-    speed_parser.add_argument('speed', type=int, help='Port speed in Mbps (10, 100, 1000, etc.)')
-    speed_parser.set_defaults(func=set_port_speed)
+    for name, help_text, handler, arguments in _PORT_SUBCOMMANDS:
+        command_parser = port_subparsers.add_parser(name, help=help_text)
+        for arg_name, kwargs in arguments:
+            command_parser.add_argument(arg_name, **kwargs)
+        command_parser.set_defaults(func=handler)
@@ -5,51 +5,196 @@ This module provides commands for configuring and managing routing functionality
 including static routes, routing protocols, and viewing routing tables.
 """
 
+import sys
+import socket
 import argparse
-import ipaddress
-from ...api.switch_controller import SwitchController
+import operator
+import functools
+from typing import TYPE_CHECKING
+from .lazy_argparse import LazySubParsersAction, add_command_parser
+
+if TYPE_CHECKING:
+    from ...api.switch_controller import SwitchController
+
+# Row of the routing table printed by show_routes, filled from _ROUTE_FIELDS
+_ROUTE_ROW = "%-18s %-16s %-10s %-9s %s"
+_ROUTE_FIELDS = operator.itemgetter('destination', 'next_hop', 'interface', 'protocol', 'metric')
+
+# Number of distinct networks/addresses whose canonical form is remembered,
+# so batch files adding, showing and deleting the same routes parse each once
+_CANONICAL_CACHE_SIZE = 2048
+
+
+def _pack_address(address: str):
+    """
+    Convert an IPv4 or IPv6 address to its packed form
+    
+    Args:
+        address: Address string
+        
+    Returns:
+        Tuple of (address family, packed address bytes)
+        
+    Raises:
+        ValueError: If the address is not a valid IPv4 or IPv6 address
+    """
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            return family, socket.inet_pton(family, address)
+        except OSError:
+            continue
+    raise ValueError(f"{address!r} does not appear to be an IPv4 or IPv6 address")
+
+
+def _netmask_prefix_len(netmask: str) -> int:
+    """Convert an IPv4 netmask (255.255.0.0) or hostmask (0.0.255.255) to a prefix length"""
+    try:
+        mask = int.from_bytes(socket.inet_pton(socket.AF_INET, netmask), 'big')
+    except OSError:
+        raise ValueError(f"{netmask!r} is not a valid netmask") from None
+    
+    # Netmask first, so 255.255.255.255 is /32 rather than the hostmask of /0
+    for prefix_len in range(33):
+        if mask == 0xFFFFFFFF ^ ((1 << (32 - prefix_len)) - 1):
+            return prefix_len
+    
+    # Then hostmask, in the same order as ipaddress
+    for prefix_len in range(33):
+        if mask == (1 << (32 - prefix_len)) - 1:
+            return prefix_len
+    raise ValueError(f"{netmask!r} is not a valid netmask")
+
+
+@functools.lru_cache(maxsize=_CANONICAL_CACHE_SIZE)
+def _parse_network(network: str):
+    """
+    Parse a network into its packed form, with host bits cleared
+    
+    Args:
+        network: Network such as 192.168.1.5/24, 10.0.0.0/255.0.0.0 or 2001:db8::/32;
+            a bare address is treated as a host route
+        
+    Returns:
+        Tuple of (address family, packed network bytes, prefix length)
+        
+    Raises:
+        ValueError: If the network is not valid
+    """
+    address, has_prefix, prefix = network.partition('/')
+    family, packed = _pack_address(address)
+    max_prefix_len = len(packed) * 8
+    
+    if not has_prefix:
+        prefix_len = max_prefix_len
+    elif prefix.isascii() and prefix.isdigit():
+        prefix_len = int(prefix)
+        if prefix_len > max_prefix_len:
+            raise ValueError(f"{prefix!r} is not a valid prefix length")
+    elif family == socket.AF_INET:
+        prefix_len = _netmask_prefix_len(prefix)
+    else:
+        raise ValueError(f"{prefix!r} is not a valid prefix length")
+    
+    host_bits = (1 << (max_prefix_len - prefix_len)) - 1
+    network_int = int.from_bytes(packed, 'big') & ~host_bits
+    return family, network_int.to_bytes(len(packed), 'big'), prefix_len
+
+
+@functools.lru_cache(maxsize=_CANONICAL_CACHE_SIZE)
+def _ipaddress_network(network: str) -> str:
+    """Canonical form of a network via ipaddress, for input inet_pton rejects"""
+    # Imported here so CLI runs that never see such input skip loading it
+    import ipaddress
+    return str(ipaddress.ip_network(network, strict=False))
+
+
+@functools.lru_cache(maxsize=_CANONICAL_CACHE_SIZE)
+def _ipaddress_address(address: str) -> str:
+    """Canonical form of an address via ipaddress, for input inet_pton rejects"""
+    import ipaddress
+    return str(ipaddress.ip_address(address))
+
+
+@functools.lru_cache(maxsize=_CANONICAL_CACHE_SIZE)
+def _validate_and_normalize_network(network: str) -> str:
+    """
+    Validate a network and return it in canonical CIDR form, with host bits
+    cleared and the address formatted by inet_ntop
+    
+    Raises:
+        ValueError: If the network is not valid
+    """
+    if '%' in network:
+        # Scoped IPv6 address (fe80::1%eth0), not understood by inet_pton
+        return _ipaddress_network(network)
+    
+    family, packed, prefix_len = _parse_network(network)
+    return f"{socket.inet_ntop(family, packed)}/{prefix_len}"
+
+
+@functools.lru_cache(maxsize=_CANONICAL_CACHE_SIZE)
+def _validate_address(address: str) -> str:
+    """
+    Validate an IPv4 or IPv6 address and return its canonical form
+    
+    Raises:
+        ValueError: If the address is not valid
+    """
+    if '%' in address:
+        return _ipaddress_address(address)
+    
+    family, packed = _pack_address(address)
+    return socket.inet_ntop(family, packed)
+
+
+def _network_type(network: str) -> str:
+    """argparse type converting a network argument to its canonical form"""
+    try:
+        return _validate_and_normalize_network(network)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid IP address or subnet format: {e}") from None
+
+
+def _address_type(address: str) -> str:
+    """argparse type converting an address argument to its canonical form"""
+    try:
+        return _validate_address(address)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid IP address format: {e}") from None
 
 
 def show_routes(args, switch_ctrl):
     """Display routing table information"""
     if args.destination:
-        try:
-            # Validate IP address/subnet format
-            dest = ipaddress.ip_network(args.destination, strict=False)
-            # Show specific route
-            route = switch_ctrl.get_route(str(dest))
-            if not route:
-                print(f"Error: Route for {args.destination} not found")
-                return
-            
-            print(f"Destination: {route['destination']}")
-            print(f"  Next Hop: {route['next_hop']}")
-            print(f"  Interface: {route['interface']}")
-            print(f"  Protocol: {route['protocol']}")
-            print(f"  Metric: {route['metric']}")
-            print(f"  Admin Distance: {route['admin_distance']}")
-        except ValueError:
-            print(f"Error: Invalid IP address or subnet format: {args.destination}")
+        # Show specific route, args.destination is validated by _network_type
+        route = switch_ctrl.get_route(args.destination)
+        if not route:
+            print(f"Error: Route for {args.destination} not found")
+            return
+        
+        print(f"Destination: {route['destination']}")
+        print(f"  Next Hop: {route['next_hop']}")
+        print(f"  Interface: {route['interface']}")
+        print(f"  Protocol: {route['protocol']}")
+        print(f"  Metric: {route['metric']}")
+        print(f"  Admin Distance: {route['admin_distance']}")
     else:
         # Show all routes
         routes = switch_ctrl.get_all_routes()
-        print("Destination       Next Hop         Interface  Protocol  Metric")
-        print("--------------------------------------------------------------")
-        for route in routes:
-            print(f"{route['destination']:<18} {route['next_hop']:<16} "
-                  f"{route['interface']:<10} {route['protocol']:<9} {route['metric']}")
+        lines = ["Destination       Next Hop         Interface  Protocol  Metric",
+                 "--------------------------------------------------------------"]
+        lines.extend([_ROUTE_ROW % _ROUTE_FIELDS(route) for route in routes])
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
 
 
 def add_route(args, switch_ctrl):
     """Add a static route"""
     try:
-        # Validate IP address/subnet formats
-        dest = ipaddress.ip_network(args.destination, strict=False)
-        next_hop = ipaddress.ip_address(args.next_hop)
-        
+        # args.destination and args.next_hop are validated at parse time
         result = switch_ctrl.add_static_route(
-            destination=str(dest),
-            next_hop=str(next_hop),
+            destination=args.destination,
+            next_hop=args.next_hop,
             interface=args.interface,
             metric=args.metric
         )
@@ -58,8 +203,6 @@ def add_route(args, switch_ctrl):
             print(f"Static route to {args.destination} via {args.next_hop} added successfully")
         else:
             print(f"Failed to add static route")
-    except ValueError as e:
-        print(f"Error: Invalid IP format - {str(e)}")
     except Exception as e:
         print(f"Error: {str(e)}")
 
@@ -67,76 +210,110 @@ def add_route(args, switch_ctrl):
 def delete_route(args, switch_ctrl):
     """Delete a route"""
     try:
-        # Validate IP address/subnet format
-        dest = ipaddress.ip_network(args.destination, strict=False)
-        
-        result = switch_ctrl.delete_route(str(dest))
+        # args.destination is validated at parse time
+        result = switch_ctrl.delete_route(args.destination)
         if result:
             print(f"Route to {args.destination} deleted successfully")
         else:
             print(f"Failed to delete route to {args.destination}")
-    except ValueError:
-        print(f"Error: Invalid IP address or subnet format: {args.destination}")
     except Exception as e:
         print(f"Error: {str(e)}")
 
 
+def _ospf_enable(args, switch_ctrl):
+    """Enable OSPF for the selected area"""
+    result = switch_ctrl.enable_ospf(area_id=args.area)
+    if result:
+        print(f"OSPF enabled for area {args.area}")
+    else:
+        print("Failed to enable OSPF")
+
+
+def _ospf_disable(args, switch_ctrl):
+    """Disable OSPF"""
+    result = switch_ctrl.disable_ospf()
+    if result:
+        print("OSPF disabled")
+    else:
+        print("Failed to disable OSPF")
+
+
+def _ospf_status(args, switch_ctrl):
+    """Display OSPF status"""
+    status = switch_ctrl.get_ospf_status()
+    print(f"OSPF Status: {'Enabled' if status['enabled'] else 'Disabled'}")
+    if status['enabled']:
+        print(f"Router ID: {status['router_id']}")
+        print("Areas:")
+        for area in status['areas']:
+            print(f"  Area {area['id']}: {area['interfaces']} interfaces")
+
+
+# OSPF action name -> handler, also the choices of the ospf action argument
+_OSPF_ACTIONS = {
+    'enable': _ospf_enable,
+    'disable': _ospf_disable,
+    'status': _ospf_status,
+}
+
+
 def config_ospf(args, switch_ctrl):
     """Configure OSPF protocol"""
-    if args.action == "enable":
-        result = switch_ctrl.enable_ospf(area_id=args.area)
-        if result:
-            print(f"OSPF enabled for area {args.area}")
-        else:
-            print("Failed to enable OSPF")
-    elif args.action == "disable":
-        result = switch_ctrl.disable_ospf()
-        if result:
-            print("OSPF disabled")
-        else:
-            print("Failed to disable OSPF")
-    elif args.action == "status":
-        status = switch_ctrl.get_ospf_status()
-        print(f"OSPF Status: {'Enabled' if status['enabled'] else 'Disabled'}")
-        if status['enabled']:
-            print(f"Router ID: {status['router_id']}")
-            print("Areas:")
-            for area in status['areas']:
-                print(f"  Area {area['id']}: {area['interfaces']} interfaces")
+    # args.action is one of _OSPF_ACTIONS, enforced by argparse
+    _OSPF_ACTIONS[args.action](args, switch_ctrl)
+
+
+def _build_show_parser(parser):
+    """Add the arguments of the routing show command"""
+    parser.add_argument('destination', nargs='?', type=_network_type,
+                        help='Destination network (e.g., 192.168.1.0/24)')
+    parser.set_defaults(func=show_routes)
+
+
+def _build_add_parser(parser):
+    """Add the arguments of the routing add command"""
+    parser.add_argument('destination', type=_network_type, help='Destination network (e.g., 192.168.1.0/24)')
+    parser.add_argument('next_hop', type=_address_type, help='Next hop IP address')
+    parser.add_argument('--interface', '-i', required=True, help='Outgoing interface')
+    parser.add_argument('--metric', '-m', type=int, default=1, help='Route metric (default: 1)')
+    parser.set_defaults(func=add_route)
+
+
+def _build_delete_parser(parser):
+    """Add the arguments of the routing delete command"""
+    parser.add_argument('destination', type=_network_type,
+                        help='Destination network to delete (e.g., 192.168.1.0/24)')
+    parser.set_defaults(func=delete_route)
+
+
+def _build_ospf_parser(parser):
+    """Add the arguments of the routing ospf command"""
+    parser.add_argument('action', choices=tuple(_OSPF_ACTIONS), help='OSPF action')
+    parser.add_argument('--area', '-a', type=int, default=0, help='OSPF area ID (default: 0)')
+    parser.set_defaults(func=config_ospf)
+
+
+def _build_routing_parser(routing_parser):
+    """Add the routing subcommands, each built only when selected"""
+    routing_subparsers = routing_parser.add_subparsers(dest='routing_command', help='Routing commands',
+                                                       action=LazySubParsersAction)
+    routing_subparsers.required = True
+    
+    routing_subparsers.add_lazy_parser('show', _build_show_parser, help='Show routing table')
+    routing_subparsers.add_lazy_parser('add', _build_add_parser, help='Add a static route')
+    routing_subparsers.add_lazy_parser('delete', _build_delete_parser, help='Delete a route')
+    routing_subparsers.add_lazy_parser('ospf', _build_ospf_parser, help='OSPF configuration')
 
 
 def register_routing_commands(subparsers):
     """
     Register all routing-related commands with the CLI parser
     
+    Subcommand arguments are only added once the subcommand is selected,
+    and if subparsers is a LazySubParsersAction, so is the routing command.
+    
     Args:
         subparsers: The subparsers object from argparse to register commands with
     """
-    # Create routing command parser
-    routing_parser = subparsers.add_parser('routing', help='Routing configuration and management')
-    routing_subparsers = routing_parser.add_subparsers(dest='routing_command', help='Routing commands')
-    routing_subparsers.required = True
-    
-    # Show routes command
-    show_parser = routing_subparsers.add_parser('show', help='Show routing table')
-    show_parser.add_argument('destination', nargs='?', help='Destination network (e.g., 192.168.1.0/24)')
-    show_parser.set_defaults(func=show_routes)
-    
-    # Add route command
-    add_parser = routing_subparsers.add_parser('add', help='Add a static route')
-    add_parser.add_argument('destination', help='Destination network (e.g., 192.168.1.0/24)')
-    add_parser.add_argument('next_hop', help='Next hop IP address')
-    add_parser.add_argument('--interface', '-i', required=True, help='Outgoing interface')
-    add_parser.add_argument('--metric', '-m', type=int, default=1, help='Route metric (default: 1)')
-    add_parser.set_defaults(func=add_route)
-    
-    # Delete route command
-    delete_parser = routing_subparsers.add_parser('delete', help='Delete a route')
-    delete_parser.add_argument('destination', help='Destination network to delete (e.g., 192.168.1.0/24)')
-    delete_parser.set_defaults(func=delete_route)
-    
-    # OSPF configuration command
-    ospf_parser = routing_subparsers.add_parser('ospf', help='OSPF configuration')
-    ospf_parser.add_argument('action', choices=['enable', 'disable', 'status'], help='OSPF action')
-    ospf_parser.add_argument('--area', '-a', type=int, default=0, help='OSPF area ID (default: 0)')
-    ospf_parser.set_defaults(func=config_ospf)
+    add_command_parser(subparsers, 'routing', _build_routing_parser,
+                       help='Routing configuration and management')
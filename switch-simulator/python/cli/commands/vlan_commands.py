@@ -5,13 +5,45 @@ This module provides commands for configuring and managing VLANs,
 including creating/deleting VLANs and assigning ports to VLANs.
 """
 
+import sys
 import argparse
-from ...api.switch_controller import SwitchController
+import operator
+from typing import TYPE_CHECKING
+from .lazy_argparse import LazySubParsersAction, add_command_parser
+
+if TYPE_CHECKING:
+    from ...api.switch_controller import SwitchController
+
+# Row of the VLAN table printed by show_vlan: id, name, status, port list
+_VLAN_ROW = "%-8s %-20s %-9s %s"
+_VLAN_FIELDS = operator.itemgetter('id', 'name', 'active', 'ports')
+_PORT_ID = operator.itemgetter('id')
+
+# VLAN status shown by show_vlan, indexed by the VLAN's active flag
+_VLAN_STATUS = ('Inactive', 'Active')
+
+# Port modes accepted by add-port, in the order shown in help
+_PORT_MODES = ('access', 'trunk', 'hybrid')
+
+# Range of usable VLAN IDs
+_MIN_VLAN_ID = 1
+_MAX_VLAN_ID = 4094
+
+
+def _vlan_id_type(value: str) -> int:
+    """argparse type for VLAN ID arguments, rejecting IDs outside 1-4094"""
+    try:
+        vlan_id = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid VLAN ID: {value!r}") from None
+    if not _MIN_VLAN_ID <= vlan_id <= _MAX_VLAN_ID:
+        raise argparse.ArgumentTypeError(f"VLAN ID must be between {_MIN_VLAN_ID} and {_MAX_VLAN_ID}")
+    return vlan_id
 
 
 def show_vlan(args, switch_ctrl):
     """Display VLAN information"""
-    if args.vlan_id:
+    if args.vlan_id is not None:
         # Show specific VLAN
         vlan = switch_ctrl.get_vlan(args.vlan_id)
         if not vlan:
@@ -19,29 +51,27 @@ def show_vlan(args, switch_ctrl):
             return
         
         print(f"VLAN {vlan['id']} - {vlan['name']}")
-        print(f"  Status: {'Active' if vlan['active'] else 'Inactive'}")
+        print(f"  Status: {_VLAN_STATUS[bool(vlan['active'])]}")
         print("  Ports:")
         if vlan['ports']:
-            for port in vlan['ports']:
-                print(f"    {port['id']} - {port['mode']}")
+            print("\n".join([f"    {port['id']} - {port['mode']}" for port in vlan['ports']]))
         else:
             print("    No ports assigned")
     else:
         # Show all VLANs
         vlans = switch_ctrl.get_all_vlans()
-        print("VLAN ID  Name                 Status    Ports")
-        print("------------------------------------------------")
-        for vlan in vlans:
-            port_list = ", ".join([str(p['id']) for p in vlan['ports']])
-            print(f"{vlan['id']:<8} {vlan['name']:<20} {'Active' if vlan['active'] else 'Inactive':<9} {port_list}")
+        lines = ["VLAN ID  Name                 Status    Ports",
+                 "------------------------------------------------"]
+        for vlan_id, name, active, ports in map(_VLAN_FIELDS, vlans):
+            port_list = ", ".join(map(str, map(_PORT_ID, ports)))
+            lines.append(_VLAN_ROW % (vlan_id, name, _VLAN_STATUS[bool(active)], port_list))
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
 
 
 def create_vlan(args, switch_ctrl):
     """Create a new VLAN"""
-    if args.vlan_id < 1 or args.vlan_id > 4094:
-        print("Error: VLAN ID must be between 1 and 4094")
-        return
-    
+    # args.vlan_id range is checked by _vlan_id_type at parse time
     try:
         result = switch_ctrl.create_vlan(args.vlan_id, args.name)
         if result:
@@ -66,11 +96,7 @@ def delete_vlan(args, switch_ctrl):
 
 def add_port_to_vlan(args, switch_ctrl):
     """Add a port to a VLAN"""
-    valid_modes = ['access', 'trunk', 'hybrid']
-    if args.mode not in valid_modes:
-        print(f"Error: Mode must be one of {valid_modes}")
-        return
-    
+    # args.mode is restricted to _PORT_MODES by argparse choices
     try:
         result = switch_ctrl.add_port_to_vlan(
             port_id=args.port_id,
@@ -98,44 +124,63 @@ def remove_port_from_vlan(args, switch_ctrl):
         print(f"Error: {str(e)}")
 
 
+def _build_show_parser(parser):
+    """Add the arguments of the vlan show command"""
+    parser.add_argument('vlan_id', nargs='?', type=_vlan_id_type, help='VLAN ID (1-4094, optional, shows all VLANs if omitted)')
+    parser.set_defaults(func=show_vlan)
+
+
+def _build_create_parser(parser):
+    """Add the arguments of the vlan create command"""
+    parser.add_argument('vlan_id', type=_vlan_id_type, help='VLAN ID (1-4094)')
+    parser.add_argument('name', help='VLAN name')
+    parser.set_defaults(func=create_vlan)
+
+
+def _build_delete_parser(parser):
+    """Add the arguments of the vlan delete command"""
+    parser.add_argument('vlan_id', type=_vlan_id_type, help='VLAN ID to delete')
+    parser.set_defaults(func=delete_vlan)
+
+
+def _build_add_port_parser(parser):
+    """Add the arguments of the vlan add-port command"""
+    parser.add_argument('vlan_id', type=_vlan_id_type, help='VLAN ID')
+    parser.add_argument('port_id', type=int, help='Port ID')
+    parser.add_argument('--mode', '-m', default='access', choices=_PORT_MODES,
+                        help='Port mode (default: access)')
+    parser.set_defaults(func=add_port_to_vlan)
+
+
+def _build_remove_port_parser(parser):
+    """Add the arguments of the vlan remove-port command"""
+    parser.add_argument('vlan_id', type=_vlan_id_type, help='VLAN ID')
+    parser.add_argument('port_id', type=int, help='Port ID')
+    parser.set_defaults(func=remove_port_from_vlan)
+
+
+def _build_vlan_parser(vlan_parser):
+    """Add the VLAN subcommands, each built only when selected"""
+    vlan_subparsers = vlan_parser.add_subparsers(dest='vlan_command', help='VLAN commands',
+                                                 action=LazySubParsersAction)
+    vlan_subparsers.required = True
+    
+    vlan_subparsers.add_lazy_parser('show', _build_show_parser, help='Show VLAN information')
+    vlan_subparsers.add_lazy_parser('create', _build_create_parser, help='Create a new VLAN')
+    vlan_subparsers.add_lazy_parser('delete', _build_delete_parser, help='Delete a VLAN')
+    vlan_subparsers.add_lazy_parser('add-port', _build_add_port_parser, help='Add a port to a VLAN')
+    vlan_subparsers.add_lazy_parser('remove-port', _build_remove_port_parser, help='Remove a port from a VLAN')
+
+
 def register_vlan_commands(subparsers):
     """
     Register all VLAN-related commands with the CLI parser
     
+    The vlan command itself is built lazily when subparsers is a
+    LazySubParsersAction; see _build_vlan_parser for its subcommands.
+    
     Args:
         subparsers: The subparsers object from argparse to register commands with
     """
-    # Create VLAN command parser
-    vlan_parser = subparsers.add_parser('vlan', help='VLAN configuration and management')
-    vlan_subparsers = vlan_parser.add_subparsers(dest='vlan_command', help='VLAN commands')
-    vlan_subparsers.required = True
-    
-    # Show VLAN command
-    show_parser = vlan_subparsers.add_parser('show', help='Show VLAN information')
-    show_parser.add_argument('vlan_id', nargs='?', type=int, help='VLAN ID (optional, shows all VLANs if omitted)')
-    show_parser.set_defaults(func=show_vlan)
-    
-    # Create VLAN command
-    create_parser = vlan_subparsers.add_parser('create', help='Create a new VLAN')
-    create_parser.add_argument('vlan_id', type=int, help='VLAN ID (1-4094)')
-    create_parser.add_argument('name', help='VLAN name')
-    create_parser.set_defaults(func=create_vlan)
-    
-    # Delete VLAN command
-    delete_parser = vlan_subparsers.add_parser('delete', help='Delete a VLAN')
-    delete_parser.add_argument('vlan_id', type=int, help='VLAN ID to delete')
-    delete_parser.set_defaults(func=delete_vlan)
-    
-    # Add port to VLAN command
-    add_port_parser = vlan_subparsers.add_parser('add-port', help='Add a port to a VLAN')
-    add_port_parser.add_argument('vlan_id', type=int, help='VLAN ID')
-    add_port_parser.add_argument('port_id', type=int, help='Port ID')
-    add_port_parser.add_argument('--mode', '-m', default='access', choices=['access', 'trunk', 'hybrid'],
-                              help='Port mode (default: access)')
-    add_port_parser.set_defaults(func=add_port_to_vlan)
-    
-    # Remove port from VLAN command
-    remove_port_parser = vlan_subparsers.add_parser('remove-port', help='Remove a port from a VLAN')
-    remove_port_parser.add_argument('vlan_id', type=int, help='VLAN ID')
-    remove_port_parser.add_argument('port_id', type=int, help='Port ID')
-    remove_port_parser.set_defaults(func=remove_port_from_vlan)
+    add_command_parser(subparsers, 'vlan', _build_vlan_parser,
+                       help='VLAN configuration and management')
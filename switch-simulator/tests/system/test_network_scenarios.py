@@ -6,10 +6,13 @@ System test for network scenarios in the switch simulator
 import sys
 import os
 import time
+import socket
 import unittest
 import subprocess
 import signal
+import collections
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the parent directory to the path so we can import the Python API
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../python')))
@@ -17,90 +20,196 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from api.switch_controller import SwitchController
 from api.stats_viewer import StatsViewer
 
+# Path to the simulator executable
+SIMULATOR_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../build/switch-simulator'))
+
+# Set to host:port of an already running simulator to reuse it instead of
+# starting one for this module
+SIMULATOR_ADDR_ENV = 'SWITCH_SIM_ADDR'
+
+# Concurrent controller calls per topology setup tier
+SETUP_WORKERS = 8
+
+# Number of simulator stderr lines kept for the report at teardown
+STDERR_TAIL_LINES = 4096
+
+# Simulator process started by setUpModule, None when reusing one
+_simulator_process = None
+_simulator_stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+_stderr_drain_thread = None
+
+
+def _drain_stream(stream, lines):
+    """Read a pipe until EOF, keeping only the last lines, so the writer never blocks on it"""
+    with stream:
+        for line in stream:
+            lines.append(line)
+
+
+def _simulator_address():
+    """Get the (host, port) of the simulator under test"""
+    host, _, port = os.environ.get(SIMULATOR_ADDR_ENV, 'localhost:8000').rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def _wait_for_simulator(address, process=None, timeout=10.0, initial_delay=0.05, max_delay=0.5):
+    """
+    Wait until the simulator accepts connections, polling with exponential backoff
+    
+    Fails as soon as process, the simulator started by this module if any,
+    has exited.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        try:
+            socket.create_connection(address, timeout=delay).close()
+            return
+        except OSError:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Simulator exited with code {process.returncode} before accepting connections")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError(f"Simulator not reachable on {address[0]}:{address[1]} after {timeout}s")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+
+def setUpModule():
+    """Start the switch simulator process, unless one is already running"""
+    global _simulator_process, _stderr_drain_thread
+    
+    if os.environ.get(SIMULATOR_ADDR_ENV):
+        _wait_for_simulator(_simulator_address())
+        return
+    
+    # Start the simulator in a separate process. Only stderr is kept, as raw
+    # bytes drained in the background so a chatty simulator can't fill the pipe
+    _simulator_process = subprocess.Popen([SIMULATOR_PATH, '--config=test_config.json'],
+                                          stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.PIPE)
+    # Cleanups also run when setUpModule fails, unlike tearDownModule
+    unittest.addModuleCleanup(_stop_simulator)
+    _stderr_drain_thread = Thread(target=_drain_stream,
+                                  args=(_simulator_process.stderr, _simulator_stderr_tail),
+                                  daemon=True)
+    _stderr_drain_thread.start()
+    
+    # Wait for simulator to initialize
+    _wait_for_simulator(_simulator_address(), _simulator_process)
+
+
+def _stop_simulator():
+    """Stop the switch simulator process if this module started it"""
+    global _simulator_process, _stderr_drain_thread
+    
+    # Send SIGTERM to the simulator process
+    if _simulator_process:
+        _simulator_process.terminate()
+        try:
+            _simulator_process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            _simulator_process.kill()
+            _simulator_process.wait()
+        
+        # Get output for debugging
+        if _stderr_drain_thread:
+            _stderr_drain_thread.join(timeout=5)
+        if _simulator_stderr_tail:
+            stderr = b"".join(_simulator_stderr_tail).decode(errors='replace')
+            print(f"Simulator stderr: {stderr}")
+        _simulator_process = None
+        _stderr_drain_thread = None
+
+
 class TestNetworkScenarios(unittest.TestCase):
     """Test cases for various network scenarios"""
     
     @classmethod
     def setUpClass(cls):
-        """Start the switch simulator process"""
-        # Path to the simulator executable
-        cls.simulator_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 
-                                             '../../build/switch-simulator'))
-        
-        # Start the simulator in a separate process
-        cls.simulator_process = subprocess.Popen([cls.simulator_path, '--config=test_config.json'],
-                                                stdout=subprocess.PIPE,
-                                                stderr=subprocess.PIPE,
-                                                universal_newlines=True)
-        
-        # Wait for simulator to initialize
-        time.sleep(2)
-        
+        """Connect to the switch simulator and set up the test topology"""
         # Create API controller instance
-        cls.controller = SwitchController('localhost', 8000)
-        cls.stats_viewer = StatsViewer('localhost', 8000)
+        host, port = _simulator_address()
+        cls.controller = SwitchController(host, port)
+        cls.stats_viewer = StatsViewer(host, port)
         
         # Setup test topology
         cls._setup_test_topology()
     
     @classmethod
-    def tearDownClass(cls):
-        """Stop the switch simulator process"""
-        # Send SIGTERM to the simulator process
-        if cls.simulator_process:
-            cls.simulator_process.terminate()
-            try:
-                cls.simulator_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                cls.simulator_process.kill()
-            
-            # Get output for debugging
-            stdout, stderr = cls.simulator_process.communicate()
-            if stderr:
-                print(f"Simulator stderr: {stderr}")
+    def _run_setup_tier(cls, calls):
+        """Issue independent controller calls concurrently and wait for all of them"""
+        with ThreadPoolExecutor(max_workers=SETUP_WORKERS) as executor:
+            futures = [executor.submit(func, *args) for func, *args in calls]
+            for future in futures:
+                future.result()  # Re-raise any failure
     
     @classmethod
     def _setup_test_topology(cls):
         """Setup the test topology for the network scenarios"""
+        controller = cls.controller
+        
+        # Initialize up front, the lazy initialization of the first call is
+        # not safe to race from several threads
+        controller.initialize()
+        
+        # Calls within a tier are independent, each tier depends on the previous one
         # Configure ports
-        for port_id in range(8):
-            cls.controller.configure_port(port_id, 'up', '1G', 'full')
-        
-        # Configure VLANs
-        cls.controller.create_vlan(10, 'data_vlan')
-        cls.controller.create_vlan(20, 'voice_vlan')
-        
-        # Configure port VLAN membership
-        # Ports 0, 1 in VLAN 10 as untagged
-        cls.controller.add_port_to_vlan(10, 0, 'untagged')
-        cls.controller.add_port_to_vlan(10, 1, 'untagged')
-        
-        # Ports 2, 3 in VLAN 20 as untagged
-        cls.controller.add_port_to_vlan(20, 2, 'untagged')
-        cls.controller.add_port_to_vlan(20, 3, 'untagged')
-        
-        # Ports 4, 5 as trunk ports for both VLANs
-        cls.controller.add_port_to_vlan(10, 4, 'tagged')
-        cls.controller.add_port_to_vlan(20, 4, 'tagged')
-        cls.controller.add_port_to_vlan(10, 5, 'tagged')
-        cls.controller.add_port_to_vlan(20, 5, 'tagged')
-        
-        # Configure IP interfaces
-        cls.controller.create_interface('vlan10', '192.168.10.1', '255.255.255.0', 10)
-        cls.controller.create_interface('vlan20', '192.168.20.1', '255.255.255.0', 20)
-        
-        # Configure static MAC entries
-        cls.controller.add_static_mac('00:11:22:33:44:55', 10, 0)
-        cls.controller.add_static_mac('00:11:22:33:44:66', 10, 1)
-        cls.controller.add_static_mac('00:11:22:33:44:77', 20, 2)
-        cls.controller.add_static_mac('00:11:22:33:44:88', 20, 3)
-        
-        # Configure static routes
-        cls.controller.add_static_route('10.0.0.0', '255.255.255.0', '192.168.10.254')
-        cls.controller.add_static_route('172.16.0.0', '255.255.0.0', '192.168.20.254')
+        port_calls = [(controller.configure_port, port_id, 'up', '1G', 'full') for port_id in range(8)]
+        cls._run_setup_tier(port_calls + [
+            # Configure VLANs
+            (controller.create_vlan, 10, 'data_vlan'),
+            (controller.create_vlan, 20, 'voice_vlan'),
+        ])
+        
+        cls._run_setup_tier([
+            # Configure port VLAN membership
+            # Ports 0, 1 in VLAN 10 as untagged
+            (controller.add_port_to_vlan, 10, 0, 'untagged'),
+            (controller.add_port_to_vlan, 10, 1, 'untagged'),
+            
+            # Ports 2, 3 in VLAN 20 as untagged
+            (controller.add_port_to_vlan, 20, 2, 'untagged'),
+            (controller.add_port_to_vlan, 20, 3, 'untagged'),
+            
+            # Ports 4, 5 as trunk ports for both VLANs
+            (controller.add_port_to_vlan, 10, 4, 'tagged'),
+            (controller.add_port_to_vlan, 20, 4, 'tagged'),
+            (controller.add_port_to_vlan, 10, 5, 'tagged'),
+            (controller.add_port_to_vlan, 20, 5, 'tagged'),
+            
+            # Configure IP interfaces
+            (controller.create_interface, 'vlan10', '192.168.10.1', '255.255.255.0', 10),
+            (controller.create_interface, 'vlan20', '192.168.20.1', '255.255.255.0', 20),
+        ])
+        
+        cls._run_setup_tier([
+            # Configure static MAC entries
+            (controller.add_static_mac, '00:11:22:33:44:55', 10, 0),
+            (controller.add_static_mac, '00:11:22:33:44:66', 10, 1),
+            (controller.add_static_mac, '00:11:22:33:44:77', 20, 2),
+            (controller.add_static_mac, '00:11:22:33:44:88', 20, 3),
+            
+            # Entries used by individual tests that don't change the outcome of
+            # others, installed once instead of by every test that needs them
+            # MAC learned on trunk port 4 (test_l2_trunk_port)
+            (controller.add_static_mac, '00:11:22:33:44:99', 10, 4),
+            # Routed destination host in VLAN 20 (test_l3_routing_between_vlans)
+            (controller.add_static_mac, '00:aa:bb:cc:dd:ee', 20, 2),
+            (controller.add_arp_entry, '192.168.20.100', '00:aa:bb:cc:dd:ee'),
+            # Next hop of the 10.0.0.0/24 static route (test_l3_static_route)
+            (controller.add_arp_entry, '192.168.10.254', '00:aa:bb:cc:dd:ff'),
+            
+            # Configure static routes
+            (controller.add_static_route, '10.0.0.0', '255.255.255.0', '192.168.10.254'),
+            (controller.add_static_route, '172.16.0.0', '255.255.0.0', '192.168.20.254'),
+        ])
     
     def test_l2_switching_same_vlan(self):
         """Test L2 switching between ports in the same VLAN"""
+        send = self.controller.send_test_packet
+        get_stats = self.stats_viewer.get_port_stats
+        
         # Create a test packet from port 0 to port 1 (VLAN 10)
         packet = {
             'src_mac': '00:11:22:33:44:55',
@@ -111,7 +220,7 @@ class TestNetworkScenarios(unittest.TestCase):
         }
         
         # Send the packet and get the result
-        result = self.controller.send_test_packet(0, packet)
+        result = send(0, packet)
         
         # Verify packet was forwarded correctly
         self.assertEqual(result['status'], 'success')
@@ -119,14 +228,17 @@ class TestNetworkScenarios(unittest.TestCase):
         self.assertEqual(result['forwarding_reason'], 'unicast_dst')
         
         # Check the stats were updated
-        port_stats = self.stats_viewer.get_port_stats(0)
+        port_stats = get_stats(0)
         self.assertGreater(port_stats['tx_packets'], 0)
         
-        port_stats = self.stats_viewer.get_port_stats(1)
+        port_stats = get_stats(1)
         self.assertGreater(port_stats['rx_packets'], 0)
     
     def test_l2_switching_different_vlans(self):
         """Test L2 switching between ports in different VLANs (shouldn't work)"""
+        send = self.controller.send_test_packet
+        get_stats = self.stats_viewer.get_port_stats
+        
         # Create a test packet from port 0 (VLAN 10) to port 2 (VLAN 20)
         packet = {
             'src_mac': '00:11:22:33:44:55',
@@ -137,21 +249,21 @@ class TestNetworkScenarios(unittest.TestCase):
         }
         
         # Send the packet and get the result
-        result = self.controller.send_test_packet(0, packet)
+        result = send(0, packet)
         
         # Verify packet was not forwarded to port 2
         self.assertEqual(result['status'], 'dropped')
         self.assertEqual(result['drop_reason'], 'dst_not_found_in_vlan')
         
         # Packet might be flooded within VLAN 10, but not to port 2
-        port_stats = self.stats_viewer.get_port_stats(2)
+        port_stats = get_stats(2)
         rx_before = port_stats['rx_packets']
         
         # Send again
-        self.controller.send_test_packet(0, packet)
+        send(0, packet)
         
         # Check stats - should be unchanged for port 2
-        port_stats = self.stats_viewer.get_port_stats(2)
+        port_stats = get_stats(2)
         self.assertEqual(port_stats['rx_packets'], rx_before)
     
     def test_l2_trunk_port(self):
@@ -165,8 +277,8 @@ class TestNetworkScenarios(unittest.TestCase):
             'payload': 'Test L2 trunk port'
         }
         
-        # First, add the MAC to simulate it being learned on the trunk port
-        self.controller.add_static_mac('00:11:22:33:44:99', 10, 4)
+        # The MAC is installed on the trunk port by _setup_test_topology
+        # to simulate it being learned there
         
         # Send the packet and get the result
         result = self.controller.send_test_packet(0, packet)
@@ -179,6 +291,9 @@ class TestNetworkScenarios(unittest.TestCase):
     
     def test_l2_broadcast(self):
         """Test L2 broadcast forwarding"""
+        send = self.controller.send_test_packet
+        get_stats_bulk = self.stats_viewer.get_port_stats_bulk
+        
         # Create a broadcast packet from port 0
         packet = {
             'src_mac': '00:11:22:33:44:55',
@@ -188,35 +303,31 @@ class TestNetworkScenarios(unittest.TestCase):
             'payload': 'Test L2 broadcast'
         }
         
+        watched_ports = (0, 1, 2, 4)
+        
         # Get port stats before
-        port0_stats_before = self.stats_viewer.get_port_stats(0)
-        port1_stats_before = self.stats_viewer.get_port_stats(1)
-        port2_stats_before = self.stats_viewer.get_port_stats(2)
-        port4_stats_before = self.stats_viewer.get_port_stats(4)
+        stats_before = get_stats_bulk(watched_ports)
         
         # Send the packet and get the result
-        result = self.controller.send_test_packet(0, packet)
+        result = send(0, packet)
         
         # Verify packet was broadcast within VLAN
         self.assertEqual(result['status'], 'broadcast')
         
         # Check stats after
-        port0_stats_after = self.stats_viewer.get_port_stats(0)
-        port1_stats_after = self.stats_viewer.get_port_stats(1)
-        port2_stats_after = self.stats_viewer.get_port_stats(2)
-        port4_stats_after = self.stats_viewer.get_port_stats(4)
+        stats_after = get_stats_bulk(watched_ports)
         
         # Port 0 (source) - TX should increase
-        self.assertGreater(port0_stats_after['tx_packets'], port0_stats_before['tx_packets'])
+        self.assertGreater(stats_after[0]['tx_packets'], stats_before[0]['tx_packets'])
         
         # Port 1 (same VLAN) - RX should increase
-        self.assertGreater(port1_stats_after['rx_packets'], port1_stats_before['rx_packets'])
+        self.assertGreater(stats_after[1]['rx_packets'], stats_before[1]['rx_packets'])
         
         # Port 2 (different VLAN) - RX should not change
-        self.assertEqual(port2_stats_after['rx_packets'], port2_stats_before['rx_packets'])
+        self.assertEqual(stats_after[2]['rx_packets'], stats_before[2]['rx_packets'])
         
         # Port 4 (trunk in VLAN 10) - RX should increase
-        self.assertGreater(port4_stats_after['rx_packets'], port4_stats_before['rx_packets'])
+        self.assertGreater(stats_after[4]['rx_packets'], stats_before[4]['rx_packets'])
     
     def test_l3_routing_between_vlans(self):
         """Test L3 routing between VLANs"""
@@ -233,11 +344,8 @@ class TestNetworkScenarios(unittest.TestCase):
             'payload': 'Test L3 inter-VLAN routing'
         }
         
-        # First, add the destination MAC in VLAN 20
-        self.controller.add_static_mac('00:aa:bb:cc:dd:ee', 20, 2)
-        
-        # Add ARP entry for destination IP
-        self.controller.add_arp_entry('192.168.20.100', '00:aa:bb:cc:dd:ee')
+        # The destination MAC in VLAN 20 and its ARP entry are installed
+        # by _setup_test_topology
         
         # Send the packet and get the result
         result = self.controller.send_test_packet(0, packet)
@@ -268,8 +376,7 @@ class TestNetworkScenarios(unittest.TestCase):
             'payload': 'Test L3 static route'
         }
         
-        # Add ARP entry for next hop
-        self.controller.add_arp_entry('192.168.10.254', '00:aa:bb:cc:dd:ff')
+        # The ARP entry for the next hop is installed by _setup_test_topology
         
         # Send the packet and get the result
         result = self.controller.send_test_packet(0, packet)
@@ -283,6 +390,8 @@ class TestNetworkScenarios(unittest.TestCase):
     
     def test_acl_filtering(self):
         """Test ACL packet filtering"""
+        send = self.controller.send_test_packet
+        
         # Configure ACL to block TCP traffic from 192.168.10.100 to 192.168.20.100
         self.controller.add_acl_rule({
             'priority': 10,
@@ -291,6 +400,8 @@ class TestNetworkScenarios(unittest.TestCase):
             'dst_ip': '192.168.20.100',
             'protocol': 6  # TCP
         })
+        # Remove the rule even if an assertion fails, it would drop traffic in other tests
+        self.addCleanup(self.controller.delete_acl_rule, 10)
         
         # Create a packet that should be blocked
         packet = {
@@ -306,7 +417,7 @@ class TestNetworkScenarios(unittest.TestCase):
         }
         
         # Send the packet and get the result
-        result = self.controller.send_test_packet(0, packet)
+        result = send(0, packet)
         
         # Verify packet was blocked by ACL
         self.assertEqual(result['status'], 'dropped')
@@ -316,13 +427,10 @@ class TestNetworkScenarios(unittest.TestCase):
         packet['protocol'] = 17  # UDP
         packet['payload'] = 'Test ACL filtering - UDP'
         
-        result = self.controller.send_test_packet(0, packet)
+        result = send(0, packet)
         
         # Verify packet was not blocked
         self.assertNotEqual(result['status'], 'dropped')
-        
-        # Clean up ACL rule
-        self.controller.delete_acl_rule(10)
     
     def test_qos_priority(self):
         """Test QoS priority handling"""
@@ -333,6 +441,7 @@ class TestNetworkScenarios(unittest.TestCase):
             'action': 'mark',
             'dscp': 46  # Expedited Forwarding
         })
+        self.addCleanup(self.controller.delete_qos_rule, 10)
         
         # Create a packet that should be marked
         packet = {
@@ -353,9 +462,6 @@ class TestNetworkScenarios(unittest.TestCase):
         
         # Verify DSCP was marked
         self.assertEqual(result['dscp'], 46)
-        
-        # Clean up QoS rule
-        self.controller.delete_qos_rule(10)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the first-token dispatch index of the CLI command handlers
+"""
+
+import sys
+import os
+import types
+import importlib
+import unittest
+from unittest import mock
+
+PYTHON_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../python'))
+
+# cli_parser is imported as part of the python package. python.cli is
+# registered without running its __init__, which imports the whole CLI.
+sys.path.insert(0, os.path.dirname(PYTHON_DIR))
+if 'python.cli' not in sys.modules:
+    _cli_package = types.ModuleType('python.cli')
+    _cli_package.__path__ = [os.path.join(PYTHON_DIR, 'cli')]
+    sys.modules['python.cli'] = _cli_package
+
+cli_parser = importlib.import_module('python.cli.cli_parser')
+CommandHandler = cli_parser.CommandHandler
+
+
+class TestDispatchIndex(unittest.TestCase):
+    """Test cases for CommandHandler.get_dispatch_candidates"""
+    
+    def setUp(self):
+        """Give each test an empty command registry"""
+        for name in ('_commands', '_compiled', '_help_text', '_mode_restrictions',
+                     '_mode_index', '_autocomplete_prefix'):
+            patcher = mock.patch.object(CommandHandler, name, {})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(CommandHandler, '_by_first_token', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def _register(self, pattern):
+        """Register a handler returning its own pattern"""
+        CommandHandler.register(pattern)(lambda match, context: pattern)
+    
+    def _dispatch(self, command_str):
+        """Get the pattern of the first candidate matching a command, as parse_and_execute does"""
+        for _, pattern, compiled, _ in CommandHandler.get_dispatch_candidates(command_str):
+            if compiled.match(command_str):
+                return pattern
+        return None
+    
+    def test_anchored(self):
+        """Test patterns anchored at both ends"""
+        self._register(r'^show port (\d+)$')
+        self._register(r'^show vlan$')
+        self._register(r'^reload$')
+        self.assertEqual(self._dispatch('show port 3'), r'^show port (\d+)$')
+        self.assertEqual(self._dispatch('SHOW VLAN'), r'^show vlan$')
+        self.assertEqual(self._dispatch('reload'), r'^reload$')
+        self.assertIsNone(self._dispatch('show interfaces'))
+    
+    def test_unanchored(self):
+        """Test that patterns without an end anchor still match longer tokens"""
+        self._register(r'^show')
+        self._register(r'ping (\S+)')
+        self.assertEqual(self._dispatch('showing'), r'^show')
+        self.assertEqual(self._dispatch('show'), r'^show')
+        self.assertEqual(self._dispatch('ping 10.0.0.1'), r'ping (\S+)')
+    
+    def test_alternation(self):
+        """Test that every branch of a top-level alternation is dispatched"""
+        self._register(r'^show version|^ver$')
+        self._register(r'^(no )?shutdown$')
+        self._register(r'^show (ip|ipv6) route$')
+        self.assertEqual(self._dispatch('show version'), r'^show version|^ver$')
+        self.assertEqual(self._dispatch('ver'), r'^show version|^ver$')
+        self.assertEqual(self._dispatch('no shutdown'), r'^(no )?shutdown$')
+        self.assertEqual(self._dispatch('show ipv6 route'), r'^show (ip|ipv6) route$')
+    
+    def test_registration_order(self):
+        """Test that indexed and unindexed candidates keep their registration order"""
+        self._register(r'^show (.*)$')
+        self._register(r'^show version|^ver$')
+        self.assertEqual(self._dispatch('show version'), r'^show (.*)$')
+    
+    def test_has_top_level_alternation(self):
+        """Test that only unescaped | outside groups and classes count"""
+        self.assertTrue(cli_parser._has_top_level_alternation(r'^a|^b'))
+        self.assertFalse(cli_parser._has_top_level_alternation(r'^a (b|c)$'))
+        self.assertFalse(cli_parser._has_top_level_alternation(r'^a \|$'))
+        self.assertFalse(cli_parser._has_top_level_alternation(r'^a [|]$'))
+        self.assertFalse(cli_parser._has_top_level_alternation(r'^a []|]$'))
+
+
+if __name__ == '__main__':
+    unittest.main()
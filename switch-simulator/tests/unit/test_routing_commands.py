@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the network and netmask parsing of the routing CLI commands
+"""
+
+import sys
+import os
+import types
+import importlib
+import unittest
+
+PYTHON_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../python'))
+
+# The command modules use relative imports, so they are imported as part of
+# the python package. python.cli is registered without running its
+# __init__, which imports the whole CLI.
+sys.path.insert(0, os.path.dirname(PYTHON_DIR))
+if 'python.cli' not in sys.modules:
+    _cli_package = types.ModuleType('python.cli')
+    _cli_package.__path__ = [os.path.join(PYTHON_DIR, 'cli')]
+    sys.modules['python.cli'] = _cli_package
+
+routing_commands = importlib.import_module('python.cli.commands.routing_commands')
+
+
+class TestNetworkNormalization(unittest.TestCase):
+    """Test cases for _validate_and_normalize_network"""
+    
+    def test_cidr_prefix(self):
+        """Test networks given with a prefix length"""
+        normalize = routing_commands._validate_and_normalize_network
+        self.assertEqual(normalize('10.1.2.3/24'), '10.1.2.0/24')
+        self.assertEqual(normalize('10.1.1.1'), '10.1.1.1/32')
+        self.assertEqual(normalize('2001:db8::1/64'), '2001:db8::/64')
+    
+    def test_netmask(self):
+        """Test networks given with a netmask"""
+        normalize = routing_commands._validate_and_normalize_network
+        self.assertEqual(normalize('10.1.2.3/255.255.255.0'), '10.1.2.0/24')
+        self.assertEqual(normalize('10.1.2.3/0.0.0.0'), '0.0.0.0/0')
+    
+    def test_host_netmask(self):
+        """Test that 255.255.255.255 is read as the /32 netmask, not the /0 hostmask"""
+        normalize = routing_commands._validate_and_normalize_network
+        self.assertEqual(normalize('10.1.1.1/255.255.255.255'), '10.1.1.1/32')
+    
+    def test_hostmask(self):
+        """Test networks given with a hostmask"""
+        normalize = routing_commands._validate_and_normalize_network
+        self.assertEqual(normalize('10.1.2.3/0.0.0.255'), '10.1.2.0/24')
+    
+    def test_invalid(self):
+        """Test that invalid networks are rejected"""
+        normalize = routing_commands._validate_and_normalize_network
+        for network in ('10.1.2.3/33', '10.1.2.3/255.0.255.0', '10.1.2/24', 'not-a-network'):
+            with self.assertRaises(ValueError, msg=network):
+                normalize(network)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,7 +10,9 @@ import subprocess
 import argparse
 import glob
 import time
-import xml.etree.ElementTree as ET
+import tempfile
+from xml.sax.saxutils import XMLGenerator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Определение путей
@@ -22,6 +24,9 @@ INTEGRATION_TEST_DIR = os.path.join(TEST_DIR, "integration")
 SYSTEM_TEST_DIR = os.path.join(TEST_DIR, "system")
 REPORT_DIR = os.path.join(BUILD_DIR, "test-reports")
 
+# Число тестов, одновременно запускаемых под Valgrind
+VALGRIND_WORKERS = 2
+
 # Цвета для вывода в терминал
 class Colors:
     HEADER = '\033[95m'
@@ -33,9 +38,29 @@ class Colors:
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
 
+def color_line(message, color):
+    """Строка цветного сообщения для вывода в терминал"""
+    return f"{color}{message}{Colors.ENDC}\n"
+
+def write_output(text):
+    """
+    Выводит текст одной записью в sys.stdout.buffer и сбрасывает буфер
+    
+    Одна запись не перемешивается с выводом тестов из других потоков
+    """
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        # stdout подменён объектом без двоичного буфера
+        sys.stdout.write(text)
+        sys.stdout.flush()
+        return
+    
+    buffer.write(text.encode(sys.stdout.encoding or "utf-8", errors="replace"))
+    buffer.flush()
+
 def print_color(message, color):
     """Вывод цветного сообщения в терминал"""
-    print(f"{color}{message}{Colors.ENDC}")
+    write_output(color_line(message, color))
 
 def ensure_dir_exists(directory):
     """Проверяет, существует ли директория, и если нет, создает её"""
@@ -86,6 +111,40 @@ def find_python_tests(test_dir):
     test_files = glob.glob(os.path.join(test_dir, "test_*.py"))
     return test_files
 
+def run_captured(cmd):
+    """
+    Запускает команду и возвращает CompletedProcess с её выводом
+    
+    Вывод пишется во временные файлы, а не в каналы: сам процесс-тест
+    пишет прямо в файл, а читается вывод только после его завершения
+    """
+    with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+        returncode = subprocess.call(cmd, stdout=stdout_file, stderr=stderr_file)
+        
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+        return subprocess.CompletedProcess(
+            cmd,
+            returncode,
+            stdout=stdout_file.read().decode(errors="replace"),
+            stderr=stderr_file.read().decode(errors="replace")
+        )
+
+def report_test_result(test_name, success, elapsed_time, result, verbose):
+    """Выводит результат теста и, если нужно, его вывод одной записью"""
+    if success:
+        parts = [color_line(f"✓ {test_name} прошел ({elapsed_time:.2f}s)", Colors.GREEN)]
+    else:
+        parts = [color_line(f"✗ {test_name} не прошел ({elapsed_time:.2f}s)", Colors.RED)]
+    
+    if verbose or not success:
+        if result.stdout:
+            parts.append(result.stdout + "\n")
+        if result.stderr:
+            parts.append(color_line(result.stderr, Colors.YELLOW))
+    
+    write_output("".join(parts))
+
 def run_c_test(test_path, use_valgrind=False, verbose=False):
     """Запускает тест на C и возвращает результат"""
     start_time = time.time()
@@ -96,27 +155,13 @@ def run_c_test(test_path, use_valgrind=False, verbose=False):
     cmd.append(test_path)
     
     try:
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        result = run_captured(cmd)
         elapsed_time = time.time() - start_time
         
         test_name = os.path.basename(test_path)
         success = result.returncode == 0
         
-        if success:
-            print_color(f"✓ {test_name} прошел ({elapsed_time:.2f}s)", Colors.GREEN)
-        else:
-            print_color(f"✗ {test_name} не прошел ({elapsed_time:.2f}s)", Colors.RED)
-        
-        if verbose or not success:
-            if result.stdout:
-                print(result.stdout)
-            if result.stderr:
-                print_color(result.stderr, Colors.YELLOW)
+        report_test_result(test_name, success, elapsed_time, result, verbose)
         
         return {
             "name": test_name,
@@ -141,27 +186,13 @@ def run_python_test(test_path, verbose=False):
     start_time = time.time()
     
     try:
-        result = subprocess.run(
-            [sys.executable, "-m", "unittest", test_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        result = run_captured([sys.executable, "-m", "unittest", test_path])
         elapsed_time = time.time() - start_time
         
         test_name = os.path.basename(test_path)
         success = result.returncode == 0
         
-        if success:
-            print_color(f"✓ {test_name} прошел ({elapsed_time:.2f}s)", Colors.GREEN)
-        else:
-            print_color(f"✗ {test_name} не прошел ({elapsed_time:.2f}s)", Colors.RED)
-        
-        if verbose or not success:
-            if result.stdout:
-                print(result.stdout)
-            if result.stderr:
-                print_color(result.stderr, Colors.YELLOW)
+        report_test_result(test_name, success, elapsed_time, result, verbose)
         
         return {
             "name": test_name,
@@ -181,6 +212,13 @@ def run_python_test(test_path, verbose=False):
             "stderr": str(e)
         }
 
+def write_xml_element(xml, name, text, attrs=None):
+    """Записывает элемент с текстом через XMLGenerator"""
+    xml.startElement(name, attrs or {})
+    if text:
+        xml.characters(text)
+    xml.endElement(name)
+
 def create_xml_report(results, report_dir):
     """Создает XML отчет о результатах тестирования"""
     ensure_dir_exists(report_dir)
@@ -188,35 +226,39 @@ def create_xml_report(results, report_dir):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     report_file = os.path.join(report_dir, f"test-report-{timestamp}.xml")
     
-    root = ET.Element("testsuites")
-    
-    for test_type, test_results in results.items():
-        testsuite = ET.SubElement(root, "testsuite")
-        testsuite.set("name", test_type)
-        testsuite.set("tests", str(len(test_results)))
+    # Отчёт пишется по мере обхода результатов, без построения дерева в памяти
+    with open(report_file, "wb") as f:
+        xml = XMLGenerator(f, encoding="utf-8", short_empty_elements=True)
+        xml.startDocument()
+        xml.startElement("testsuites", {})
         
-        # Подсчет количества успешных/неуспешных тестов
-        failures = sum(1 for r in test_results if not r["success"])
-        testsuite.set("failures", str(failures))
-        
-        for test_result in test_results:
-            testcase = ET.SubElement(testsuite, "testcase")
-            testcase.set("name", test_result["name"])
-            testcase.set("time", str(test_result["time"]))
-            
-            if not test_result["success"]:
-                failure = ET.SubElement(testcase, "failure")
-                failure.set("message", "Test failed")
-                failure.text = test_result["stderr"]
+        for test_type, test_results in results.items():
+            # Подсчет количества успешных/неуспешных тестов
+            failures = sum(1 for r in test_results if not r["success"])
+            xml.startElement("testsuite", {
+                "name": test_type,
+                "tests": str(len(test_results)),
+                "failures": str(failures)
+            })
             
-            system_out = ET.SubElement(testcase, "system-out")
-            system_out.text = test_result["stdout"]
+            for test_result in test_results:
+                xml.startElement("testcase", {
+                    "name": test_result["name"],
+                    "time": str(test_result["time"])
+                })
+                
+                if not test_result["success"]:
+                    write_xml_element(xml, "failure", test_result["stderr"], {"message": "Test failed"})
+                
+                write_xml_element(xml, "system-out", test_result["stdout"])
+                write_xml_element(xml, "system-err", test_result["stderr"])
+                
+                xml.endElement("testcase")
             
-            system_err = ET.SubElement(testcase, "system-err")
-            system_err.text = test_result["stderr"]
-    
-    tree = ET.ElementTree(root)
-    tree.write(report_file, encoding="utf-8", xml_declaration=True)
+            xml.endElement("testsuite")
+        
+        xml.endElement("testsuites")
+        xml.endDocument()
     
     print_color(f"XML отчет сохранен в {report_file}", Colors.BLUE)
 
@@ -237,4 +279,58 @@ def print_summary(results):
     print_color(f"\nВсего тестов: {total_tests}", Colors.BOLD)
     print_color(f"Успешно: {total_passed}", Colors.GREEN)
     if total_failed > 0:
-        print_color(
+        print_color(f"Не прошло: {total_failed}", Colors.RED)
+
+def run_tests_parallel(test_files, run_test, max_workers):
+    """Запускает тесты в max_workers потоках, результаты сортируются по имени теста"""
+    if not test_files:
+        return []
+    
+    # Тесты - отдельные процессы, поэтому потоков достаточно: пока
+    # subprocess ждёт завершения теста, GIL освобождён
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(run_test, test_files))
+    
+    return sorted(results, key=lambda result: result["name"])
+
+def main():
+    """Точка входа: запускает выбранные тесты и выводит итоги"""
+    args = parse_args()
+    
+    # Под Valgrind тесты потребляют много памяти, поэтому их запускается меньше
+    c_workers = VALGRIND_WORKERS if args.valgrind else (os.cpu_count() or 1)
+    
+    def run_c(test_path):
+        return run_c_test(test_path, args.valgrind, args.verbose)
+    
+    def run_python(test_path):
+        return run_python_test(test_path, args.verbose)
+    
+    results = {}
+    
+    if args.all or args.unit:
+        print_color("\n=== Юнит-тесты ===", Colors.BOLD + Colors.HEADER)
+        results["unit"] = (run_tests_parallel(find_test_executables(UNIT_TEST_DIR), run_c, c_workers) +
+                           # Юнит-тесты на Python не требуют собранного симулятора
+                           run_tests_parallel(find_python_tests(UNIT_TEST_DIR), run_python, os.cpu_count() or 1))
+    
+    if args.all or args.integration:
+        print_color("\n=== Интеграционные тесты ===", Colors.BOLD + Colors.HEADER)
+        results["integration"] = run_tests_parallel(find_test_executables(INTEGRATION_TEST_DIR), run_c, c_workers)
+    
+    if args.all or args.system:
+        # Каждый системный тест запускает свой симулятор на одном и том же
+        # порту, поэтому они выполняются по одному
+        print_color("\n=== Системные тесты ===", Colors.BOLD + Colors.HEADER)
+        results["system"] = run_tests_parallel(find_python_tests(SYSTEM_TEST_DIR), run_python, 1)
+    
+    if args.xml:
+        create_xml_report(results, REPORT_DIR)
+    
+    print_summary(results)
+    
+    all_passed = all(r["success"] for test_results in results.values() for r in test_results)
+    return 0 if all_passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Numba compiled Fruchterman-Reingold layout for network_topology.py.
+
+The fr_iter kernel comes from the layout_ext extension when it has been
+built by build_layout_ext.py, and is compiled on first use otherwise.
+Importing this module raises ImportError if neither the extension nor
+numba is available, which network_topology.py takes as the signal to use
+another layout.
+"""
+
+import numpy as np
+
+try:
+    from numba import prange
+except ImportError:
+    # Only the prebuilt extension can be used then
+    prange = range
+
+
+def _fr_iter(pos, adj_indptr, adj_indices, k, t):
+    """Move every node by one Fruchterman-Reingold step, in place.
+    
+    This is the source of the fr_iter kernel, both the JIT compiled one and
+    the one build_layout_ext.py compiles ahead of time.
+    
+    Args:
+        pos: (N, 2) float32 array of positions
+        adj_indptr: CSR row pointers of the adjacency, N + 1 entries
+        adj_indices: CSR column indices of the adjacency
+        k: Optimal distance between nodes
+        t: Temperature, the largest distance a node may move
+    """
+    n = pos.shape[0]
+    disp = np.zeros_like(pos)
+    k2 = k * k
+    
+    for i in prange(n):
+        xi = pos[i, 0]
+        yi = pos[i, 1]
+        dx_sum = 0.0
+        dy_sum = 0.0
+        
+        # Repulsion k²/d from every other node
+        for j in range(n):
+            if j != i:
+                dx = xi - pos[j, 0]
+                dy = yi - pos[j, 1]
+                d2 = max(dx * dx + dy * dy, 1e-8)
+                dx_sum += dx * k2 / d2
+                dy_sum += dy * k2 / d2
+        
+        # Attraction d²/k toward the neighbors
+        for p in range(adj_indptr[i], adj_indptr[i + 1]):
+            j = adj_indices[p]
+            dx = xi - pos[j, 0]
+            dy = yi - pos[j, 1]
+            d = np.sqrt(dx * dx + dy * dy)
+            dx_sum -= dx * d / k
+            dy_sum -= dy * d / k
+        
+        disp[i, 0] = dx_sum
+        disp[i, 1] = dy_sum
+    
+    # Positions are only updated once all the displacements are known
+    for i in prange(n):
+        length = max(np.sqrt(disp[i, 0] * disp[i, 0] + disp[i, 1] * disp[i, 1]), 1e-8)
+        step = min(length, t) / length
+        pos[i, 0] += disp[i, 0] * step
+        pos[i, 1] += disp[i, 1] * step
+
+
+try:
+    from layout_ext import fr_iter
+except ImportError:
+    from numba import njit
+    
+    fr_iter = njit(parallel=True, fastmath=True, cache=True)(_fr_iter)
+
+
+def fr_layout(num_nodes: int, edges, seed: int = 42, iterations: int = 50):
+    """Compute a Fruchterman-Reingold layout with the compiled fr_iter kernel.
+    
+    The temperature cools linearly over the iterations, as in networkx's
+    spring_layout.
+    
+    Args:
+        num_nodes: Number of nodes
+        edges: (node index, node index) pairs
+        seed: Seed of the random initial positions
+        iterations: Number of fr_iter steps
+    
+    Returns:
+        A (num_nodes, 2) array of positions, centered and scaled into [-1, 1]
+    """
+    if num_nodes == 0:
+        return np.empty((0, 2))
+    
+    # CSR adjacency, with each edge stored in both directions
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    src = np.concatenate((edges[:, 0], edges[:, 1]))
+    dst = np.concatenate((edges[:, 1], edges[:, 0]))
+    order = np.argsort(src, kind='stable')
+    adj_indices = dst[order]
+    adj_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=adj_indptr[1:])
+    
+    pos = np.random.default_rng(seed).random((num_nodes, 2), dtype=np.float32)
+    k = np.float32(1.0 / np.sqrt(num_nodes))
+    t = 0.1
+    dt = t / (iterations + 1)
+    for _ in range(iterations):
+        fr_iter(pos, adj_indptr, adj_indices, k, np.float32(t))
+        t -= dt
+    
+    pos = pos.astype(float)
+    pos -= pos.mean(axis=0)
+    limit = np.abs(pos).max()
+    if limit > 0:
+        pos /= limit
+    return pos
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Build the layout_ext extension of network_topology.py.
+
+layout_ext holds the Fruchterman-Reingold kernel of _layout_numba compiled
+ahead of time, so visualizing a topology does not pay for JIT compiling it
+on first use. Run this script once after installing numba:
+
+    python build_layout_ext.py
+
+The extension is written next to this script, where _layout_numba picks
+it up; numba is not needed to use it afterwards.
+"""
+
+import os
+
+from numba.pycc import CC
+
+from _layout_numba import _fr_iter
+
+# fr_iter(pos, adj_indptr, adj_indices, k, t), as called by _layout_numba.fr_layout
+FR_ITER_SIGNATURE = 'void(f4[:, ::1], i8[::1], i8[::1], f4, f4)'
+
+cc = CC('layout_ext')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.export('fr_iter', FR_ITER_SIGNATURE)(_fr_iter)
+
+
+if __name__ == "__main__":
+    cc.compile()
@@ -11,13 +11,15 @@ topologies for testing the switch simulator.
 import json
 import logging
 import os
-import subprocess
 import sys
-import tempfile
-import time
-from typing import Dict, List, Optional, Set, Tuple, Union
-import random
-import uuid
+import itertools
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -27,10 +29,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger('network_topology')
 
+# Marks an interface missing from a device, as opposed to an unconnected one (None)
+_MISSING = object()
+
+# Largest number of edges a visualization labels with their interfaces
+MAX_EDGE_LABELS = 15
+
+# Visualizations of topologies with more devices are laid out by Barnes-Hut ForceAtlas2
+BARNES_HUT_MIN_NODES = 1000
+
+# PNG visualizations of topologies with fewer devices are drawn with Pillow, not matplotlib
+PIL_MAX_NODES = 50
+
+# Pip packages of the optional visualization modules named differently
+_PIP_PACKAGES = {
+    'PIL': 'pillow',
+}
+
+# Device type -> (color, marker area in points²) of visualized nodes
+_NODE_STYLES = {
+    'switch': ('lightblue', 700),
+    'host': ('lightgreen', 500),
+}
+
+
+class Endpoint(NamedTuple):
+    """Remote end of a connected interface."""
+    device_id: str
+    interface: str
+
 
 class NetworkDevice:
     """Base class for all network devices in the topology."""
     
+    # Topologies may hold thousands of devices, so they don't get a __dict__
+    __slots__ = ('device_id', 'device_type', 'name', 'interfaces', 'properties', '_free_interfaces')
+    
     def __init__(self, device_id: str, device_type: str, name: Optional[str] = None):
         """Initialize a network device.
         
@@ -42,8 +76,9 @@ class NetworkDevice:
         self.device_id = device_id
         self.device_type = device_type
         self.name = name or device_id
-        self.interfaces = {}  # Dict mapping interface name to connected device and its interface
+        self.interfaces = {}  # Dict mapping interface name to the Endpoint it's connected to, or None
         self.properties = {}  # Additional device-specific properties
+        self._free_interfaces = deque()  # Unconnected interface names, in the order they became free
     
     def add_interface(self, interface_name: str) -> None:
         """Add a new interface to the device.
@@ -52,22 +87,50 @@ class NetworkDevice:
             interface_name: Name of the interface to add
         """
         if interface_name in self.interfaces:
-            logger.warning(f"Interface {interface_name} already exists on device {self.name}")
+            logger.warning("Interface %s already exists on device %s", interface_name, self.name)
             return
         
         self.interfaces[interface_name] = None
-        logger.debug(f"Added interface {interface_name} to device {self.name}")
+        self._free_interfaces.append(interface_name)
+        logger.debug("Added interface %s to device %s", interface_name, self.name)
     
     def get_available_interface(self) -> Optional[str]:
         """Get an available (unconnected) interface name.
         
+        The interface stays available until it is connected.
+        
         Returns:
             Name of an available interface or None if all are connected
         """
-        for interface, connection in self.interfaces.items():
-            if connection is None:
-                return interface
-        return None
+        return self._free_interfaces[0] if self._free_interfaces else None
+    
+    def get_available_interfaces(self) -> List[str]:
+        """Get all available (unconnected) interface names.
+        
+        Returns:
+            Interface names, in the order get_available_interface would return them
+        """
+        return list(self._free_interfaces)
+    
+    def _claim_interface(self, interface_name: str) -> None:
+        """Remove a now connected interface from the free interfaces.
+        
+        Args:
+            interface_name: Name of the interface being connected
+        """
+        if self._free_interfaces[0] == interface_name:
+            # The usual case: the interface came from get_available_interface
+            self._free_interfaces.popleft()
+        else:
+            self._free_interfaces.remove(interface_name)
+    
+    def _release_interface(self, interface_name: str) -> None:
+        """Return a disconnected interface to the free interfaces.
+        
+        Args:
+            interface_name: Name of the interface being disconnected
+        """
+        self._free_interfaces.append(interface_name)
     
     def set_property(self, key: str, value) -> None:
         """Set a device property.
@@ -96,16 +159,10 @@ class NetworkDevice:
         Returns:
             Dictionary representation of the device
         """
-        connections = {}
-        for intf, conn in self.interfaces.items():
-            if conn is not None:
-                remote_device, remote_intf = conn
-                connections[intf] = {
-                    'device': remote_device.device_id,
-                    'interface': remote_intf
-                }
-            else:
-                connections[intf] = None
+        connections = {
+            intf: None if conn is None else {'device': conn.device_id, 'interface': conn.interface}
+            for intf, conn in self.interfaces.items()
+        }
         
         return {
             'id': self.device_id,
@@ -115,10 +172,46 @@ class NetworkDevice:
             'connections': connections,
             'properties': self.properties
         }
+    
+    @classmethod
+    def _from_dict(cls, device_id: str, device_data: Dict) -> 'NetworkDevice':
+        """Create a device from its dictionary representation, without connections.
+        
+        The subclass constructor isn't run: the interfaces and properties are
+        taken as they were saved instead of being created and then overwritten.
+        
+        Args:
+            device_id: Unique identifier for the device
+            device_data: Dictionary representation of the device, as returned by to_dict
+            
+        Returns:
+            The device, with all its interfaces unconnected
+        """
+        device = cls.__new__(cls)
+        NetworkDevice.__init__(device, device_id, device_data['type'], device_data['name'])
+        
+        interfaces = device_data['interfaces']
+        device.interfaces = dict.fromkeys(interfaces)
+        device._free_interfaces.extend(interfaces)
+        device.properties = device_data['properties']
+        return device
 
 
 class Switch(NetworkDevice):
-    """Switch device in the network topology."""
+    """Switch device in the network topology.
+    
+    A VLAN whose ports are None holds all the ports of the switch, so the
+    default VLAN doesn't keep a list of every port of every switch. The
+    tables of an L3 switch are similarly only created when first configured.
+    
+    The switch_type property, checked whenever a switch is configured, is
+    stored in an attribute rather than in the properties dict.
+    """
+    
+    __slots__ = ('switch_type',)
+    
+    # Properties of L3 switches, empty until configured
+    L3_TABLES = ('routing_table', 'ip_interfaces')
     
     def __init__(self, device_id: str, name: Optional[str] = None, 
                  num_ports: int = 24, switch_type: str = 'l2'):
@@ -132,29 +225,95 @@ class Switch(NetworkDevice):
         """
         super().__init__(device_id, 'switch', name)
         
-        # Add the specified number of ports
+        # Add the specified number of ports, interned so all switches share the names
         for i in range(1, num_ports + 1):
-            self.add_interface(f"port{i}")
+            self.add_interface(sys.intern(f"port{i}"))
         
         # Set switch-specific properties
-        self.set_property('switch_type', switch_type)
-        self.set_property('vlans', {'1': {'name': 'default', 'ports': list(self.interfaces.keys())}})
+        self.switch_type = switch_type
+        self.set_property('vlans', {'1': {'name': 'default', 'ports': None}})
+    
+    @classmethod
+    def _from_dict(cls, device_id: str, device_data: Dict) -> 'Switch':
+        """Create a switch from its dictionary representation, without connections.
+        
+        Properties the constructor sets but the data lacks get their default value.
+        """
+        switch = super()._from_dict(device_id, device_data)
         
-        if switch_type == 'l3':
-            self.set_property('routing_table', {})
-            self.set_property('ip_interfaces', {})
+        properties = switch.properties
+        switch.switch_type = properties.pop('switch_type', 'l2')
+        properties.setdefault('vlans', {'1': {'name': 'default', 'ports': None}})
+        return switch
+    
+    def set_property(self, key: str, value) -> None:
+        """Set a switch property.
+        
+        Args:
+            key: Property name
+            value: Property value
+        """
+        if key == 'switch_type':
+            self.switch_type = value
+        else:
+            self.properties[key] = value
+    
+    def get_property(self, key: str, default=None):
+        """Get a switch property.
+        
+        Args:
+            key: Property name
+            default: Default value if property doesn't exist
+            
+        Returns:
+            The property value or the default value
+        """
+        if key == 'switch_type':
+            return self.switch_type
+        return self.properties.get(key, default)
+    
+    def to_dict(self) -> Dict:
+        """Convert the switch to a dictionary representation.
+        
+        VLANs holding all ports get the list of the switch's ports, and L3
+        tables that were never configured are included empty.
+        
+        Returns:
+            Dictionary representation of the switch
+        """
+        data = super().to_dict()
+        properties = data['properties'] = {'switch_type': self.switch_type, **self.properties}
+        
+        vlans = properties.get('vlans')
+        if vlans and any(vlan.get('ports', ()) is None for vlan in vlans.values()):
+            all_ports = list(self.interfaces)
+            properties['vlans'] = {
+                vlan_id: dict(vlan, ports=all_ports) if vlan.get('ports', ()) is None else vlan
+                for vlan_id, vlan in vlans.items()
+            }
+        
+        if self.switch_type == 'l3':
+            for key in self.L3_TABLES:
+                properties.setdefault(key, {})
+        
+        return data
 
 
 class Host(NetworkDevice):
     """Host device in the network topology."""
     
-    def __init__(self, device_id: str, name: Optional[str] = None, ip_address: Optional[str] = None):
+    __slots__ = ()
+    
+    def __init__(self, device_id: str, name: Optional[str] = None, ip_address: Optional[str] = None,
+                 mac_address: Optional[str] = None):
         """Initialize a host device.
         
         Args:
             device_id: Unique identifier for the host
             name: Optional human-readable name for the host
             ip_address: Optional IP address for the host
+            mac_address: Optional MAC address for the host, a random one is
+                generated if the host has an IP address but no MAC address
         """
         super().__init__(device_id, 'host', name)
         
@@ -164,7 +323,22 @@ class Host(NetworkDevice):
         # Set host-specific properties
         if ip_address:
             self.set_property('ip_address', ip_address)
-            self.set_property('mac_address', self._generate_mac_address())
+            if mac_address is None:
+                mac_address = self._generate_mac_address()
+        if mac_address:
+            self.set_property('mac_address', mac_address)
+    
+    @classmethod
+    def _from_dict(cls, device_id: str, device_data: Dict) -> 'Host':
+        """Create a host from its dictionary representation, without connections.
+        
+        A host with an IP address but no MAC address gets a random one, as in the constructor.
+        """
+        host = super()._from_dict(device_id, device_data)
+        
+        if host.get_property('ip_address') and 'mac_address' not in host.properties:
+            host.set_property('mac_address', host._generate_mac_address())
+        return host
     
     def _generate_mac_address(self) -> str:
         """Generate a random MAC address.
@@ -172,11 +346,22 @@ class Host(NetworkDevice):
         Returns:
             A MAC address as a string
         """
-        # Generate a random MAC address with a specific prefix
-        mac = "02:00:00"  # Locally administered MAC address prefix
-        for _ in range(3):
-            mac += f":{random.randint(0, 255):02x}"
-        return mac
+        # Locally administered MAC address prefix, followed by 3 random bytes
+        return "02:00:00:%02x:%02x:%02x" % tuple(os.urandom(3))
+    
+    @staticmethod
+    def _generate_many_macs(count: int) -> List[str]:
+        """Generate random MAC addresses for several hosts at once.
+        
+        Args:
+            count: Number of MAC addresses to generate
+            
+        Returns:
+            A list of MAC addresses as strings
+        """
+        # The random bytes of all addresses are read with a single call
+        mac_bytes = os.urandom(3 * count)
+        return ["02:00:00:" + mac_bytes[i:i + 3].hex(':') for i in range(0, len(mac_bytes), 3)]
 
 
 class NetworkTopology:
@@ -190,7 +375,6 @@ class NetworkTopology:
         """
         self.name = name
         self.devices = {}  # Dict mapping device ID to device object
-        self.connections = set()  # Set of (device1_id, intf1, device2_id, intf2) tuples
     
     def add_device(self, device: NetworkDevice) -> None:
         """Add a device to the topology.
@@ -201,11 +385,14 @@ class NetworkTopology:
         Raises:
             ValueError: If a device with the same ID already exists
         """
-        if device.device_id in self.devices:
+        # setdefault only adds the device, growing the dict, if its ID is new;
+        # checking the size also catches the same device being added twice
+        num_devices = len(self.devices)
+        self.devices.setdefault(device.device_id, device)
+        if len(self.devices) == num_devices:
             raise ValueError(f"Device with ID {device.device_id} already exists in the topology")
         
-        self.devices[device.device_id] = device
-        logger.debug(f"Added device {device.name} to topology")
+        logger.debug("Added device %s to topology", device.name)
     
     def remove_device(self, device_id: str) -> None:
         """Remove a device from the topology.
@@ -216,19 +403,20 @@ class NetworkTopology:
         Raises:
             ValueError: If the device doesn't exist
         """
-        if device_id not in self.devices:
+        device = self.devices.pop(device_id, _MISSING)
+        if device is _MISSING:
             raise ValueError(f"Device with ID {device_id} doesn't exist in the topology")
         
-        # Remove all connections involving this device
-        device = self.devices[device_id]
-        for intf, conn in list(device.interfaces.items()):
+        # Remove all connections involving this device. They are known to be
+        # valid, so they are unlinked directly; each interface is re-read, as
+        # unlinking a loopback connection also clears its other end. The only
+        # remote device no longer in the topology is the device itself
+        for intf in list(device.interfaces):
+            conn = device.interfaces[intf]
             if conn is not None:
-                remote_device, remote_intf = conn
-                self.disconnect_devices(device_id, intf, remote_device.device_id, remote_intf)
+                self._unlink(device, intf, self.devices.get(conn.device_id, device), conn.interface)
         
-        # Remove the device
-        del self.devices[device_id]
-        logger.debug(f"Removed device {device_id} from topology")
+        logger.debug("Removed device %s from topology", device_id)
     
     def get_device(self, device_id: str) -> NetworkDevice:
         """Get a device by its ID.
@@ -242,10 +430,49 @@ class NetworkTopology:
         Raises:
             ValueError: If the device doesn't exist
         """
-        if device_id not in self.devices:
-            raise ValueError(f"Device with ID {device_id} doesn't exist in the topology")
+        try:
+            return self.devices[device_id]
+        except KeyError:
+            raise ValueError(f"Device with ID {device_id} doesn't exist in the topology") from None
+    
+    def _get_endpoint(self, device_id: str, interface: str) -> Tuple[NetworkDevice, Optional[Endpoint]]:
+        """Get a device and the connection of one of its interfaces.
         
-        return self.devices[device_id]
+        Args:
+            device_id: ID of the device
+            interface: Interface name on the device
+            
+        Returns:
+            Tuple of the device and the Endpoint the interface is connected
+            to, or None if it isn't connected
+            
+        Raises:
+            ValueError: If the device or the interface doesn't exist
+        """
+        device = self.get_device(device_id)
+        connection = device.interfaces.get(interface, _MISSING)
+        if connection is _MISSING:
+            raise ValueError(f"Interface {interface} doesn't exist on device {device.name}")
+        return device, connection
+    
+    def get_remote(self, device_id: str, interface: str) -> Optional[Tuple[NetworkDevice, str]]:
+        """Get the device and interface an interface is connected to.
+        
+        Args:
+            device_id: ID of the device
+            interface: Interface name on the device
+            
+        Returns:
+            Tuple of the remote device and its interface name, or None if
+            the interface isn't connected
+            
+        Raises:
+            ValueError: If the device or the interface doesn't exist
+        """
+        _, connection = self._get_endpoint(device_id, interface)
+        if connection is None:
+            return None
+        return self.devices[connection.device_id], connection.interface
     
     def connect_devices(self, 
                       device1_id: str, interface1: str, 
@@ -261,35 +488,86 @@ class NetworkTopology:
         Raises:
             ValueError: If either device doesn't exist or if interfaces are already connected
         """
-        # Get the devices
-        if device1_id not in self.devices:
-            raise ValueError(f"Device with ID {device1_id} doesn't exist in the topology")
-        if device2_id not in self.devices:
-            raise ValueError(f"Device with ID {device2_id} doesn't exist in the topology")
-        
-        device1 = self.devices[device1_id]
-        device2 = self.devices[device2_id]
+        # Get the devices and check the interfaces exist and are not already connected
+        device1, conn1 = self._get_endpoint(device1_id, interface1)
+        device2, conn2 = self._get_endpoint(device2_id, interface2)
         
-        # Check if the interfaces exist and are not already connected
-        if interface1 not in device1.interfaces:
-            raise ValueError(f"Interface {interface1} doesn't exist on device {device1.name}")
-        if interface2 not in device2.interfaces:
-            raise ValueError(f"Interface {interface2} doesn't exist on device {device2.name}")
-        
-        if device1.interfaces[interface1] is not None:
+        if conn1 is not None:
             raise ValueError(f"Interface {interface1} on device {device1.name} is already connected")
-        if device2.interfaces[interface2] is not None:
+        if conn2 is not None:
             raise ValueError(f"Interface {interface2} on device {device2.name} is already connected")
+        if device1 is device2 and interface1 == interface2:
+            raise ValueError(f"Interface {interface1} on device {device1.name} can't be connected to itself")
         
         # Connect the interfaces
-        device1.interfaces[interface1] = (device2, interface2)
-        device2.interfaces[interface2] = (device1, interface1)
+        device1.interfaces[interface1] = Endpoint(device2_id, interface2)
+        device2.interfaces[interface2] = Endpoint(device1_id, interface1)
+        device1._claim_interface(interface1)
+        device2._claim_interface(interface2)
+        
+        logger.debug("Connected %s:%s to %s:%s", device1.name, interface1, device2.name, interface2)
+    
+    def connect_many(self, edges: List[Tuple[str, str, str, str]]) -> None:
+        """Connect several pairs of devices by their interfaces.
+        
+        All connections are checked before any is made, so either all of
+        them are made or, if one is invalid, none is.
+        
+        Args:
+            edges: (device1_id, interface1, device2_id, interface2) tuples
+            
+        Raises:
+            ValueError: If a device or interface doesn't exist, or if an
+                interface is already connected or used twice in edges
+        """
+        resolved = []
+        claimed = set()  # (device ID, interface) ends used by earlier edges
+        for device1_id, interface1, device2_id, interface2 in edges:
+            device1, conn1 = self._get_endpoint(device1_id, interface1)
+            device2, conn2 = self._get_endpoint(device2_id, interface2)
+            
+            for device, interface, conn in ((device1, interface1, conn1), (device2, interface2, conn2)):
+                end = (device.device_id, interface)
+                if conn is not None or end in claimed:
+                    raise ValueError(f"Interface {interface} on device {device.name} is already connected")
+                claimed.add(end)
+            
+            resolved.append((device1, interface1, device2, interface2))
+        
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for device1, interface1, device2, interface2 in resolved:
+            device1.interfaces[interface1] = Endpoint(device2.device_id, interface2)
+            device2.interfaces[interface2] = Endpoint(device1.device_id, interface1)
+            device1._claim_interface(interface1)
+            device2._claim_interface(interface2)
+            
+            if debug:
+                logger.debug("Connected %s:%s to %s:%s", device1.name, interface1, device2.name, interface2)
+    
+    def _connect_pairs(self, pairs: List[Tuple[NetworkDevice, NetworkDevice]]) -> None:
+        """Connect pairs of devices by their first available interfaces.
         
-        # Add to the connections set
-        connection = (device1_id, interface1, device2_id, interface2)
-        self.connections.add(connection)
+        The interfaces of all pairs are picked first, then the connections
+        are made with one connect_many call. A pair is skipped if either of
+        its devices has no available interface left.
+        
+        Args:
+            pairs: (device1, device2) tuples of different devices in the topology
+        """
+        free_interfaces = {}  # Device ID -> interfaces not picked yet
+        edges = []
+        for device1, device2 in pairs:
+            free1 = free_interfaces.get(device1.device_id)
+            if free1 is None:
+                free1 = free_interfaces[device1.device_id] = deque(device1.get_available_interfaces())
+            free2 = free_interfaces.get(device2.device_id)
+            if free2 is None:
+                free2 = free_interfaces[device2.device_id] = deque(device2.get_available_interfaces())
+            
+            if free1 and free2:
+                edges.append((device1.device_id, free1.popleft(), device2.device_id, free2.popleft()))
         
-        logger.debug(f"Connected {device1.name}:{interface1} to {device2.name}:{interface2}")
+        self.connect_many(edges)
     
     def disconnect_devices(self, 
                          device1_id: str, interface1: str, 
@@ -305,37 +583,32 @@ class NetworkTopology:
         Raises:
             ValueError: If either device doesn't exist or if the interfaces are not connected
         """
-        # Get the devices
-        if device1_id not in self.devices:
-            raise ValueError(f"Device with ID {device1_id} doesn't exist in the topology")
-        if device2_id not in self.devices:
-            raise ValueError(f"Device with ID {device2_id} doesn't exist in the topology")
-        
-        device1 = self.devices[device1_id]
-        device2 = self.devices[device2_id]
-        
-        # Check if the interfaces exist and are connected to each other
-        if interface1 not in device1.interfaces:
-            raise ValueError(f"Interface {interface1} doesn't exist on device {device1.name}")
-        if interface2 not in device2.interfaces:
-            raise ValueError(f"Interface {interface2} doesn't exist on device {device2.name}")
-        
-        conn1 = device1.interfaces[interface1]
-        conn2 = device2.interfaces[interface2]
+        # Get the devices and check the interfaces exist and are connected to each other
+        device1, conn1 = self._get_endpoint(device1_id, interface1)
+        device2, conn2 = self._get_endpoint(device2_id, interface2)
         
-        if conn1 is None or conn1[0] != device2 or conn1[1] != interface2:
+        # A single tuple comparison, which also covers an unconnected interface
+        if conn1 != (device2_id, interface2):
             raise ValueError(f"Devices {device1.name}:{interface1} and {device2.name}:{interface2} are not connected")
         
-        # Disconnect the interfaces
+        self._unlink(device1, interface1, device2, interface2)
+    
+    @staticmethod
+    def _unlink(device1: NetworkDevice, interface1: str, device2: NetworkDevice, interface2: str) -> None:
+        """Disconnect two interfaces known to be connected to each other.
+        
+        Args:
+            device1: The first device
+            interface1: Interface name on the first device
+            device2: The second device
+            interface2: Interface name on the second device
+        """
         device1.interfaces[interface1] = None
         device2.interfaces[interface2] = None
+        device1._release_interface(interface1)
+        device2._release_interface(interface2)
         
-        # Remove from the connections set
-        connection = (device1_id, interface1, device2_id, interface2)
-        if connection in self.connections:
-            self.connections.remove(connection)
-        
-        logger.debug(f"Disconnected {device1.name}:{interface1} from {device2.name}:{interface2}")
+        logger.debug("Disconnected %s:%s from %s:%s", device1.name, interface1, device2.name, interface2)
     
     def assign_ip_to_host(self, host_id: str, ip_address: str, subnet_mask: str = '255.255.255.0') -> None:
         """Assign an IP address to a host.
@@ -348,33 +621,27 @@ class NetworkTopology:
         Raises:
             ValueError: If the device doesn't exist or is not a host
         """
-        if host_id not in self.devices:
-            raise ValueError(f"Device with ID {host_id} doesn't exist in the topology")
-        
-        device = self.devices[host_id]
+        device = self.get_device(host_id)
         if device.device_type != 'host':
             raise ValueError(f"Device {device.name} is not a host")
         
         device.set_property('ip_address', ip_address)
         device.set_property('subnet_mask', subnet_mask)
-        logger.debug(f"Assigned IP {ip_address}/{subnet_mask} to host {device.name}")
+        logger.debug("Assigned IP %s/%s to host %s", ip_address, subnet_mask, device.name)
     
-    def configure_vlan(self, switch_id: str, vlan_id: str, vlan_name: str, ports: List[str]) -> None:
+    def configure_vlan(self, switch_id: str, vlan_id: str, vlan_name: str, ports: Optional[List[str]]) -> None:
         """Configure a VLAN on a switch.
         
         Args:
             switch_id: ID of the switch device
             vlan_id: VLAN ID
             vlan_name: VLAN name
-            ports: List of port names to add to the VLAN
+            ports: List of port names to add to the VLAN, or None for all the switch's ports
             
         Raises:
             ValueError: If the device doesn't exist or is not a switch
         """
-        if switch_id not in self.devices:
-            raise ValueError(f"Device with ID {switch_id} doesn't exist in the topology")
-        
-        device = self.devices[switch_id]
+        device = self.get_device(switch_id)
         if device.device_type != 'switch':
             raise ValueError(f"Device {device.name} is not a switch")
         
@@ -388,7 +655,7 @@ class NetworkTopology:
         }
         
         device.set_property('vlans', vlans)
-        logger.debug(f"Configured VLAN {vlan_id} ({vlan_name}) on switch {device.name}")
+        logger.debug("Configured VLAN %s (%s) on switch %s", vlan_id, vlan_name, device.name)
     
     def configure_stp(self, switch_id: str, priority: int = 32768) -> None:
         """Configure Spanning Tree Protocol on a switch.
@@ -400,15 +667,12 @@ class NetworkTopology:
         Raises:
             ValueError: If the device doesn't exist or is not a switch
         """
-        if switch_id not in self.devices:
-            raise ValueError(f"Device with ID {switch_id} doesn't exist in the topology")
-        
-        device = self.devices[switch_id]
+        device = self.get_device(switch_id)
         if device.device_type != 'switch':
             raise ValueError(f"Device {device.name} is not a switch")
         
         device.set_property('stp_priority', priority)
-        logger.debug(f"Configured STP priority {priority} on switch {device.name}")
+        logger.debug("Configured STP priority %s on switch %s", priority, device.name)
     
     def configure_routing(self, switch_id: str, dest_network: str, next_hop: str, metric: int = 1) -> None:
         """Configure a static route on a Layer 3 switch.
@@ -422,11 +686,8 @@ class NetworkTopology:
         Raises:
             ValueError: If the device doesn't exist or is not an L3 switch
         """
-        if switch_id not in self.devices:
-            raise ValueError(f"Device with ID {switch_id} doesn't exist in the topology")
-        
-        device = self.devices[switch_id]
-        if device.device_type != 'switch' or device.get_property('switch_type') != 'l3':
+        device = self.get_device(switch_id)
+        if not isinstance(device, Switch) or device.switch_type != 'l3':
             raise ValueError(f"Device {device.name} is not an L3 switch")
         
         # Get the current routing table
@@ -439,7 +700,65 @@ class NetworkTopology:
         }
         
         device.set_property('routing_table', routing_table)
-        logger.debug(f"Configured route to {dest_network} via {next_hop} on switch {device.name}")
+        logger.debug("Configured route to %s via %s on switch %s", dest_network, next_hop, device.name)
+    
+    def iter_connections(self):
+        """Iterate over the connections between the devices of the topology.
+        
+        Connections are read from the device interfaces, each one is
+        yielded once, from its lower (device ID, interface) end.
+        
+        Yields:
+            (device1_id, intf1, device2_id, intf2) tuples
+        """
+        for device_id, device in self.devices.items():
+            for intf, conn in device.interfaces.items():
+                if conn is None:
+                    continue
+                if (device_id, intf) < conn:
+                    yield device_id, intf, conn.device_id, conn.interface
+    
+    def to_igraph(self):
+        """Convert the topology to an igraph graph, for analysis of large topologies.
+        
+        The graph is a C-backed snapshot of the topology, to be queried with
+        igraph's algorithms (g.bfs(), g.distances(), g.connected_components(),
+        ...); the topology itself stays the authoritative store.
+        
+        Returns:
+            An undirected igraph.Graph with a vertex per device, with 'name',
+            'label' and 'type' attributes, and an edge per connection, with
+            'interface1' and 'interface2' attributes
+            
+        Raises:
+            ImportError: If python-igraph is not installed
+        """
+        # Imported here as igraph is an optional dependency
+        import igraph
+        
+        device_ids = list(self.devices)
+        index = {device_id: i for i, device_id in enumerate(device_ids)}
+        
+        edges = []
+        interfaces1 = []
+        interfaces2 = []
+        for device1_id, intf1, device2_id, intf2 in self.iter_connections():
+            edges.append((index[device1_id], index[device2_id]))
+            interfaces1.append(intf1)
+            interfaces2.append(intf2)
+        
+        devices = self.devices.values()
+        return igraph.Graph(
+            n=len(device_ids),
+            edges=edges,
+            graph_attrs={'name': self.name},
+            vertex_attrs={
+                'name': device_ids,
+                'label': [device.name for device in devices],
+                'type': [device.device_type for device in devices],
+            },
+            edge_attrs={'interface1': interfaces1, 'interface2': interfaces2},
+        )
     
     def to_dict(self) -> Dict:
         """Convert the topology to a dictionary representation.
@@ -457,7 +776,7 @@ class NetworkTopology:
                     'device2': device2_id,
                     'interface2': intf2
                 }
-                for device1_id, intf1, device2_id, intf2 in self.connections
+                for device1_id, intf1, device2_id, intf2 in self.iter_connections()
             ]
         }
     
@@ -467,9 +786,14 @@ class NetworkTopology:
         Args:
             filename: Path to the file to save to
         """
-        with open(filename, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
-        logger.info(f"Topology saved to {filename}")
+        if orjson is not None:
+            # OPT_NON_STR_KEYS converts non-string property keys like json.dump does
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(filename, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+        logger.info("Topology saved to %s", filename)
     
     @classmethod
     def load_from_file(cls, filename: str) -> 'NetworkTopology':
@@ -484,44 +808,29 @@ class NetworkTopology:
         Raises:
             FileNotFoundError: If the file doesn't exist
         """
-        with open(filename, 'r') as f:
-            data = json.load(f)
+        if orjson is not None:
+            with open(filename, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(filename, 'r') as f:
+                data = json.load(f)
         
         topology = cls(data.get('name', 'Loaded Topology'))
         
-        # Create devices first
+        # Create devices first, devices of unknown types are skipped
+        device_classes = {'switch': Switch, 'host': Host}
         for device_id, device_data in data['devices'].items():
-            device_type = device_data['type']
-            
-            if device_type == 'switch':
-                switch_type = device_data['properties'].get('switch_type', 'l2')
-                num_ports = len(device_data['interfaces'])
-                device = Switch(device_id, device_data['name'], num_ports, switch_type)
-                
-                # Set all properties
-                for key, value in device_data['properties'].items():
-                    device.set_property(key, value)
-                
-                topology.add_device(device)
-            
-            elif device_type == 'host':
-                ip_address = device_data['properties'].get('ip_address')
-                device = Host(device_id, device_data['name'], ip_address)
-                
-                # Set all properties
-                for key, value in device_data['properties'].items():
-                    device.set_property(key, value)
-                
-                topology.add_device(device)
+            device_class = device_classes.get(device_data['type'])
+            if device_class is not None:
+                topology.add_device(device_class._from_dict(device_id, device_data))
         
         # Connect devices
-        for connection in data['connections']:
-            topology.connect_devices(
-                connection['device1'], connection['interface1'],
-                connection['device2'], connection['interface2']
-            )
+        topology.connect_many([
+            (connection['device1'], connection['interface1'], connection['device2'], connection['interface2'])
+            for connection in data['connections']
+        ])
         
-        logger.info(f"Topology loaded from {filename}")
+        logger.info("Topology loaded from %s", filename)
         return topology
     
     @staticmethod
@@ -545,49 +854,25 @@ class NetworkTopology:
             topology.add_device(switch)
             switches.append(switch)
         
-        # Create hosts
+        # Create hosts, with IP addresses in the 192.168.1.x subnet
         hosts = []
-        for i in range(1, num_hosts + 1):
-            host_id = f"host{i}"
-            # Assign an IP address in the 192.168.1.x subnet
-            ip_address = f"192.168.1.{100 + i}"
-            host = Host(host_id, f"Host {i}", ip_address)
+        for i, mac_address in enumerate(Host._generate_many_macs(num_hosts), 1):
+            host = Host(f"host{i}", f"Host {i}", f"192.168.1.{100 + i}", mac_address)
             topology.add_device(host)
             hosts.append(host)
         
         # Connect hosts to switches
         # Distribute hosts evenly among switches
         hosts_per_switch = max(1, num_hosts // num_switches)
-        for i, host in enumerate(hosts):
-            switch_index = min(i // hosts_per_switch, num_switches - 1)
-            switch = switches[switch_index]
-            
-            # Get available interfaces
-            host_interface = host.get_available_interface()
-            switch_interface = switch.get_available_interface()
-            
-            if host_interface and switch_interface:
-                topology.connect_devices(
-                    host.device_id, host_interface,
-                    switch.device_id, switch_interface
-                )
+        pairs = [(host, switches[min(i // hosts_per_switch, num_switches - 1)])
+                 for i, host in enumerate(hosts)]
         
         # Connect switches to each other in a line
-        for i in range(len(switches) - 1):
-            # Get available interfaces
-            switch1 = switches[i]
-            switch2 = switches[i + 1]
-            
-            switch1_interface = switch1.get_available_interface()
-            switch2_interface = switch2.get_available_interface()
-            
-            if switch1_interface and switch2_interface:
-                topology.connect_devices(
-                    switch1.device_id, switch1_interface,
-                    switch2.device_id, switch2_interface
-                )
+        pairs.extend(zip(switches, switches[1:]))
+        
+        topology._connect_pairs(pairs)
         
-        logger.info(f"Created simple network with {num_switches} switches and {num_hosts} hosts")
+        logger.info("Created simple network with %s switches and %s hosts", num_switches, num_hosts)
         return topology
     
     @staticmethod
@@ -611,49 +896,26 @@ class NetworkTopology:
             topology.add_device(switch)
             switches.append(switch)
         
-        # Create hosts
+        # Create hosts, with IP addresses in the 192.168.1.x subnet
         hosts = []
-        for i in range(1, num_hosts + 1):
-            host_id = f"host{i}"
-            # Assign an IP address in the 192.168.1.x subnet
-            ip_address = f"192.168.1.{100 + i}"
-            host = Host(host_id, f"Host {i}", ip_address)
+        for i, mac_address in enumerate(Host._generate_many_macs(num_hosts), 1):
+            host = Host(f"host{i}", f"Host {i}", f"192.168.1.{100 + i}", mac_address)
             topology.add_device(host)
             hosts.append(host)
         
         # Connect hosts to switches
         # Distribute hosts evenly among switches
         hosts_per_switch = max(1, num_hosts // num_switches)
-        for i, host in enumerate(hosts):
-            switch_index = min(i // hosts_per_switch, num_switches - 1)
-            switch = switches[switch_index]
-            
-            # Get available interfaces
-            host_interface = host.get_available_interface()
-            switch_interface = switch.get_available_interface()
-            
-            if host_interface and switch_interface:
-                topology.connect_devices(
-                    host.device_id, host_interface,
-                    switch.device_id, switch_interface
-                )
-        
-        # Connect switches in a ring
-        for i in range(num_switches):
-            # Connect each switch to the next one in the ring
-            switch1 = switches[i]
-            switch2 = switches[(i + 1) % num_switches]
-            
-            switch1_interface = switch1.get_available_interface()
-            switch2_interface = switch2.get_available_interface()
-            
-            if switch1_interface and switch2_interface:
-                topology.connect_devices(
-                    switch1.device_id, switch1_interface,
-                    switch2.device_id, switch2_interface
-                )
+        pairs = [(host, switches[min(i // hosts_per_switch, num_switches - 1)])
+                 for i, host in enumerate(hosts)]
+        
+        # Connect switches in a ring, each one to the next one
+        if num_switches > 1:
+            pairs.extend(zip(switches, switches[1:] + switches[:1]))
         
-        logger.info(f"Created ring network with {num_switches} switches and {num_hosts} hosts")
+        topology._connect_pairs(pairs)
+        
+        logger.info("Created ring network with %s switches and %s hosts", num_switches, num_hosts)
         return topology
     
     @staticmethod
@@ -677,52 +939,565 @@ class NetworkTopology:
             topology.add_device(switch)
             switches.append(switch)
         
-        # Create hosts
+        # Create hosts, with IP addresses in the 192.168.1.x subnet
         hosts = []
-        for i in range(1, num_hosts + 1):
-            host_id = f"host{i}"
-            # Assign an IP address in the 192.168.1.x subnet
-            ip_address = f"192.168.1.{100 + i}"
-            host = Host(host_id, f"Host {i}", ip_address)
+        for i, mac_address in enumerate(Host._generate_many_macs(num_hosts), 1):
+            host = Host(f"host{i}", f"Host {i}", f"192.168.1.{100 + i}", mac_address)
             topology.add_device(host)
             hosts.append(host)
         
         # Connect hosts to switches
         # Distribute hosts evenly among switches
         hosts_per_switch = max(1, num_hosts // num_switches)
-        for i, host in enumerate(hosts):
-            switch_index = min(i // hosts_per_switch, num_switches - 1)
-            switch = switches[switch_index]
-            
-            # Get available interfaces
-            host_interface = host.get_available_interface()
-            switch_interface = switch.get_available_interface()
-            
-            if host_interface and switch_interface:
-                topology.connect_devices(
-                    host.device_id, host_interface,
-                    switch.device_id, switch_interface
-                )
+        pairs = [(host, switches[min(i // hosts_per_switch, num_switches - 1)])
+                 for i, host in enumerate(hosts)]
         
         # Connect switches in a full mesh
-        for i in range(num_switches):
-            for j in range(i + 1, num_switches):
-                switch1 = switches[i]
-                switch2 = switches[j]
-                
-                switch1_interface = switch1.get_available_interface()
-                switch2_interface = switch2.get_available_interface()
-                
-                if switch1_interface and switch2_interface:
-                    topology.connect_devices(
-                        switch1.device_id, switch1_interface,
-                        switch2.device_id, switch2_interface
-                    )
-        
-        logger.info(f"Created mesh network with {num_switches} switches and {num_hosts} hosts")
+        pairs.extend(itertools.combinations(switches, 2))
+        
+        topology._connect_pairs(pairs)
+        
+        logger.info("Created mesh network with %s switches and %s hosts", num_switches, num_hosts)
         return topology
 
 
+def _fr_layout_lbfgs(num_nodes: int, edges, seed: int = 42, maxiter: int = 200):
+    """Compute a Fruchterman-Reingold style layout by minimizing its energy.
+    
+    The energy is the sum of a k²/d repulsion between every pair of nodes,
+    a d²/k attraction along every edge and a weak pull toward the center,
+    which keeps unconnected nodes from drifting away. It is minimized with
+    L-BFGS using its analytic gradient; each evaluation works on a single
+    pairwise distance matrix computed from the Gram matrix of the positions.
+    
+    Args:
+        num_nodes: Number of nodes
+        edges: (node index, node index) pairs
+        seed: Seed of the random initial positions
+        maxiter: Maximum number of L-BFGS iterations
+        
+    Returns:
+        A (num_nodes, 2) array of positions, centered and scaled into [-1, 1]
+        like those of networkx's spring_layout
+        
+    Raises:
+        ImportError: If numpy or scipy is not installed
+    """
+    # Imported here as they are only needed for visualization
+    import numpy as np
+    from scipy.optimize import minimize
+    
+    if num_nodes == 0:
+        return np.empty((0, 2))
+    
+    k = 1.0 / np.sqrt(num_nodes)  # Optimal distance between nodes, as in spring_layout
+    k2 = k * k
+    gravity = 0.1
+    edges = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+    u, v = edges[:, 0], edges[:, 1]
+    diagonal = np.arange(num_nodes)
+    
+    def energy_and_grad(flat_pos):
+        pos = flat_pos.reshape(num_nodes, 2)
+        sq = np.einsum('ij,ij->i', pos, pos)
+        
+        # Repulsion: w holds the squared distances |a|² + |b|² - 2a·b, then 1/d
+        w = pos @ pos.T
+        w *= -2.0
+        w += sq[:, None]
+        w += sq[None, :]
+        np.maximum(w, 1e-9, out=w)
+        np.sqrt(w, out=w)
+        np.divide(1.0, w, out=w)
+        w[diagonal, diagonal] = 0.0
+        energy = 0.5 * k2 * w.sum()
+        
+        w3 = w * w
+        w3 *= w
+        grad = w3 @ pos
+        grad -= pos * w3.sum(axis=1)[:, None]
+        grad *= k2
+        
+        # Attraction along the edges
+        delta = pos[u] - pos[v]
+        energy += np.einsum('ij,ij->', delta, delta) / k
+        delta *= 2.0 / k
+        np.add.at(grad, u, delta)
+        np.subtract.at(grad, v, delta)
+        
+        # Pull toward the center
+        energy += 0.5 * gravity * sq.sum()
+        grad += gravity * pos
+        return energy, grad.ravel()
+    
+    initial_pos = np.random.default_rng(seed).random(num_nodes * 2)
+    result = minimize(energy_and_grad, initial_pos, jac=True, method='L-BFGS-B',
+                      options={'maxiter': maxiter})
+    
+    pos = result.x.reshape(num_nodes, 2)
+    pos -= pos.mean(axis=0)
+    limit = np.abs(pos).max()
+    if limit > 0:
+        pos /= limit
+    return pos
+
+
+def _spring_layout(num_nodes: int, edges, seed: int = 42):
+    """Compute a Fruchterman-Reingold layout with a spring_layout implementation.
+    
+    The numba compiled kernel of _layout_numba is used if numba is installed,
+    then rustworkx's spring_layout, which runs in native code, and last
+    networkx's.
+    
+    Args:
+        num_nodes: Number of nodes
+        edges: (node index, node index) pairs
+        seed: Seed of the random initial positions
+        
+    Returns:
+        A (num_nodes, 2) array of positions
+        
+    Raises:
+        ImportError: If none of numba, rustworkx and networkx is installed
+    """
+    import numpy as np
+    
+    try:
+        from _layout_numba import fr_layout
+    except ImportError:
+        pass
+    else:
+        return fr_layout(num_nodes, edges, seed=seed)
+    
+    try:
+        import rustworkx as rx
+    except ImportError:
+        import networkx as nx
+        
+        graph = nx.Graph()
+        graph.add_nodes_from(range(num_nodes))
+        graph.add_edges_from(edges)
+        
+        # A spectral layout is close to the spring layout, so starting from it
+        # takes far fewer iterations than starting from random positions. It
+        # only spreads out the nodes of a connected graph though, and puts
+        # hosts of the same switch on top of each other until jittered.
+        initial_pos = None
+        if num_nodes > 2 and nx.is_connected(graph):
+            try:
+                spectral_pos = nx.spectral_layout(graph)
+            except ImportError:
+                # Graphs of 500 nodes or more need scipy for their spectral layout
+                pass
+            else:
+                jitter = np.random.default_rng(seed).uniform(-0.05, 0.05, (num_nodes, 2))
+                initial_pos = {i: spectral_pos[i] + jitter[i] for i in range(num_nodes)}
+        
+        if initial_pos is None:
+            pos = nx.spring_layout(graph, seed=seed)
+        else:
+            pos = nx.spring_layout(graph, pos=initial_pos, iterations=15, seed=seed)
+    else:
+        graph = rx.PyGraph()
+        graph.add_nodes_from(range(num_nodes))
+        graph.add_edges_from_no_data(edges)
+        pos = rx.spring_layout(graph, seed=seed)
+    
+    return np.array([pos[i] for i in range(num_nodes)], dtype=float).reshape(-1, 2)
+
+
+def _barnes_hut_layout(num_nodes: int, edges, seed: int = 42, iterations: int = 100):
+    """Compute a ForceAtlas2 layout, with Barnes-Hut approximated repulsion.
+    
+    The repulsion between all pairs of nodes is approximated through a
+    quadtree of cell centroids, so an iteration takes O(N log N) rather
+    than O(N²) time, which pays off on large graphs.
+    
+    Args:
+        num_nodes: Number of nodes
+        edges: (node index, node index) pairs
+        seed: Seed of the random initial positions
+        iterations: Number of ForceAtlas2 iterations
+        
+    Returns:
+        A (num_nodes, 2) array of positions, centered and scaled into [-1, 1]
+        
+    Raises:
+        ImportError: If fa2, numpy or scipy is not installed
+    """
+    import numpy as np
+    import scipy.sparse
+    from fa2 import ForceAtlas2
+    
+    if num_nodes == 0:
+        return np.empty((0, 2))
+    
+    edges = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+    data = np.ones(len(edges))
+    adjacency = scipy.sparse.coo_matrix((data, (edges[:, 0], edges[:, 1])), shape=(num_nodes, num_nodes))
+    adjacency = (adjacency + adjacency.T).tocsr()
+    
+    forceatlas2 = ForceAtlas2(barnesHutOptimize=True, barnesHutTheta=1.2, verbose=False)
+    initial_pos = np.random.default_rng(seed).random((num_nodes, 2))
+    pos = np.array(forceatlas2.forceatlas2(adjacency, pos=initial_pos, iterations=iterations), dtype=float)
+    
+    pos -= pos.mean(axis=0)
+    limit = np.abs(pos).max()
+    if limit > 0:
+        pos /= limit
+    return pos
+
+
+def _compute_layout(num_nodes: int, edges, seed: int = 42):
+    """Compute a layout with the best available implementation.
+    
+    Graphs of more than BARNES_HUT_MIN_NODES nodes are laid out with
+    _barnes_hut_layout, others by minimizing the layout energy with
+    _fr_layout_lbfgs; without their dependencies, _spring_layout is used.
+    Large graphs never fall back to _fr_layout_lbfgs, whose memory use is
+    quadratic in the number of nodes.
+    
+    Args:
+        num_nodes: Number of nodes
+        edges: (node index, node index) pairs
+        seed: Seed of the random initial positions
+        
+    Returns:
+        A (num_nodes, 2) array of positions
+    """
+    if num_nodes > BARNES_HUT_MIN_NODES:
+        try:
+            return _barnes_hut_layout(num_nodes, edges, seed=seed)
+        except ImportError:
+            return _spring_layout(num_nodes, edges, seed=seed)
+    
+    try:
+        return _fr_layout_lbfgs(num_nodes, edges, seed=seed)
+    except ImportError:
+        return _spring_layout(num_nodes, edges, seed=seed)
+
+
+def _layout_method(num_nodes: int) -> str:
+    """Get the name of the implementation _compute_layout lays out a graph with.
+    
+    Args:
+        num_nodes: Number of nodes
+        
+    Returns:
+        One of 'barnes_hut', 'fr_lbfgs', 'numba', 'rustworkx' and 'networkx',
+        judged from the installed modules without importing them
+    """
+    from importlib.util import find_spec
+    
+    if num_nodes > BARNES_HUT_MIN_NODES:
+        if find_spec('fa2') and find_spec('scipy'):
+            return 'barnes_hut'
+    elif find_spec('scipy'):
+        return 'fr_lbfgs'
+    
+    # The _spring_layout implementations, in the order it tries them
+    if find_spec('layout_ext') or find_spec('numba'):
+        return 'numba'
+    if find_spec('rustworkx'):
+        return 'rustworkx'
+    return 'networkx'
+
+
+def _layout_cache_path(nodes: List[str], edges: List[Tuple[int, int]], seed: int = 42) -> str:
+    """Get the path of the cached layout of a graph.
+    
+    Args:
+        nodes: Node names, in the order of the layout positions
+        edges: (node index, node index) pairs
+        seed: Seed the layout is computed with
+        
+    Returns:
+        Path of the cache file, in the temporary directory, named after a
+        hash of the nodes, edges, seed and layout implementation so any
+        change to them changes it
+    """
+    # Imported here as they are only needed for visualization
+    import hashlib
+    import tempfile
+    
+    key_source = repr((nodes, edges, seed, _layout_method(len(nodes))))
+    key = hashlib.blake2b(key_source.encode(), digest_size=8).hexdigest()
+    return os.path.join(tempfile.gettempdir(), f"nettopo_pos_{key}.npz")
+
+
+def _precomputed_layout_path(topology_path: str) -> str:
+    """Get the path of the precomputed layout kept next to a topology file.
+    
+    Args:
+        topology_path: Path of the topology file
+        
+    Returns:
+        Path of its .layout.json sibling, e.g. ring.layout.json for ring.json
+    """
+    return os.path.splitext(topology_path)[0] + '.layout.json'
+
+
+def _load_precomputed_layout(path: str, nodes: List[str]):
+    """Load a layout saved by _save_precomputed_layout.
+    
+    Args:
+        path: Path of the layout file
+        nodes: Node names the layout must be for
+        
+    Returns:
+        A (len(nodes), 2) array of positions, or None if there is no layout
+        file or it misses some of the nodes
+    """
+    import numpy as np
+    
+    try:
+        with open(path, 'r') as f:
+            layout = json.load(f)
+        return np.array([layout[node] for node in nodes], dtype=float).reshape(-1, 2)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("Ignoring precomputed layout %s: %s", path, e)
+        return None
+
+
+def _save_precomputed_layout(path: str, nodes: List[str], pos) -> None:
+    """Save a layout as a node name -> [x, y] JSON object.
+    
+    Args:
+        path: Path of the layout file
+        nodes: Node names, in the order of the positions
+        pos: (len(nodes), 2) array of positions
+    """
+    with open(path, 'w') as f:
+        json.dump(dict(zip(nodes, pos.tolist())), f, indent=2)
+
+
+def _load_cached_layout(path: str, nodes: List[str]):
+    """Load a layout saved by _save_cached_layout.
+    
+    Args:
+        path: Path of the cache file
+        nodes: Node names the layout must be for
+        
+    Returns:
+        A (len(nodes), 2) array of positions, or None if there is no usable cached layout
+    """
+    import numpy as np
+    
+    try:
+        with np.load(path) as cached:
+            if cached['nodes'].tolist() != nodes:
+                return None
+            return cached['pos']
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _save_cached_layout(path: str, nodes: List[str], pos) -> None:
+    """Save a layout for _load_cached_layout, failing silently as it is only a cache.
+    
+    Args:
+        path: Path of the cache file
+        nodes: Node names, in the order of the positions
+        pos: (len(nodes), 2) array of positions
+    """
+    import tempfile
+    import numpy as np
+    
+    # Written to a temporary file first so concurrent runs never read a partial
+    # file. mkstemp creates it exclusively, under a name others can't predict.
+    try:
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+    except OSError as e:
+        logger.debug("Could not cache layout in %s: %s", path, e)
+        return
+    
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, nodes=np.array(nodes, dtype=str), pos=pos)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.debug("Could not cache layout in %s: %s", path, e)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def _save_figure(fig, path: str, dpi: int = 150) -> None:
+    """Save a figure, drawing it only once.
+    
+    PNG files are rendered with a single Agg draw and written by Pillow.
+    Other formats, such as vector SVG, are written by savefig.
+    
+    Args:
+        fig: matplotlib Figure, attached to an Agg canvas
+        path: Output file path
+        dpi: Resolution in dots per inch
+    """
+    if not path.lower().endswith('.png'):
+        fig.savefig(path, dpi=dpi)
+        return
+    
+    from PIL import Image
+    
+    fig.set_dpi(dpi)
+    fig.canvas.draw()
+    
+    # The image shares the renderer's buffer instead of copying it
+    renderer = fig.canvas.get_renderer()
+    size = (int(renderer.width), int(renderer.height))
+    image = Image.frombuffer('RGBA', size, fig.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+    image.save(path, compress_level=3)
+
+
+def _render_matplotlib(path: str, title: str, coords, names: List[str],
+                       types: List[str], edges: List[Tuple[int, int]],
+                       edge_interfaces: List[Tuple[str, str]], dpi: int = 150) -> None:
+    """Draw a laid out topology with matplotlib and save it.
+    
+    SVG files are written as vector graphics, other formats are rasterized.
+    
+    Args:
+        path: Output image file path
+        title: Title of the image
+        coords: (N, 2) array of node positions
+        names: Node labels
+        types: Node device types
+        edges: (node index, node index) pairs
+        edge_interfaces: (interface, interface) labels of the edges
+        dpi: Resolution in dots per inch of raster images
+        
+    Raises:
+        ImportError: If matplotlib is not installed
+    """
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    
+    # Draw edges, as a single (E, 2, 2) array of line segments
+    node_xy = coords.astype(np.float32)
+    segments = node_xy[np.asarray(edges, dtype=np.intp).reshape(-1, 2)]
+    ax.add_collection(LineCollection(segments, colors='k', linewidths=1.5, alpha=0.7, zorder=1))
+    
+    # The axes fill the figure and their limits are set from the positions,
+    # so nothing has to be measured to crop the saved image
+    fig.subplots_adjust(left=0, right=1, bottom=0, top=0.95)
+    if len(node_xy):
+        low, high = node_xy.min(axis=0), node_xy.max(axis=0)
+        pad = np.where(high > low, 0.05 * (high - low), 1.0)
+        ax.set_xlim(low[0] - pad[0], high[0] + pad[0])
+        ax.set_ylim(low[1] - pad[1], high[1] + pad[1])
+    
+    # Draw nodes, with one scatter per device type, selected by a mask over all types
+    types = np.asarray(types)
+    for device_type, (color, size) in _NODE_STYLES.items():
+        xy = node_xy[types == device_type]
+        ax.scatter(xy[:, 0], xy[:, 1], s=size, c=color, zorder=2)
+    
+    # Draw labels
+    for (x, y), name in zip(node_xy, names):
+        ax.text(x, y, name, fontsize=10, fontweight='bold', ha='center', va='center', clip_on=True)
+    
+    # Add edge labels if not too crowded, formatting them only then
+    if len(edges) <= MAX_EDGE_LABELS:
+        label_box = dict(boxstyle='round', ec='white', fc='white')
+        for (x, y), interfaces in zip(segments.mean(axis=1), edge_interfaces):
+            ax.text(x, y, " - ".join(interfaces), fontsize=8, ha='center', va='center',
+                    bbox=label_box, zorder=1, clip_on=True)
+    
+    ax.set_title(title)
+    ax.axis('off')  # Turn off axis
+    
+    # Save the figure
+    _save_figure(fig, path, dpi=dpi)
+
+
+def _render_pil(path: str, title: str, coords, names: List[str],
+                types: List[str], edges: List[Tuple[int, int]],
+                edge_interfaces: List[Tuple[str, str]], dpi: int = 150) -> None:
+    """Draw a laid out topology with Pillow and save it, in the style of _render_matplotlib.
+    
+    Setting up a matplotlib figure takes longer than drawing a small topology,
+    so those are drawn directly; the image is drawn at twice its size and
+    scaled down, which smooths the edges of lines and circles.
+    
+    Args:
+        path: Output image file path
+        title: Title of the image
+        coords: (N, 2) array of node positions
+        names: Node labels
+        types: Node device types
+        edges: (node index, node index) pairs
+        edge_interfaces: (interface, interface) labels of the edges
+        dpi: Resolution in dots per inch, of an image as large as the matplotlib figure
+        
+    Raises:
+        ImportError: If Pillow is not installed
+    """
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+    
+    # Same 12 by 8 inches as the matplotlib figure, drawn at twice the resolution
+    scale = 2
+    size = (12 * dpi, 8 * dpi)
+    width, height = size[0] * scale, size[1] * scale
+    pt = dpi * scale / 72  # Pixels per point
+    margin = round(0.6 * dpi * scale)
+    top = round(0.7 * dpi * scale)  # Room for the title
+    
+    # Map the positions into the image, with y pointing down
+    xy = np.asarray(coords, dtype=float).reshape(-1, 2)
+    low = xy.min(axis=0) if len(xy) else np.zeros(2)
+    span = np.maximum(np.ptp(xy, axis=0) if len(xy) else np.ones(2), 1e-9)
+    pixels = np.empty_like(xy)
+    pixels[:, 0] = margin + (xy[:, 0] - low[0]) / span[0] * (width - 2 * margin)
+    pixels[:, 1] = height - margin - (xy[:, 1] - low[1]) / span[1] * (height - margin - top)
+    points = [tuple(p) for p in pixels.tolist()]
+    
+    def font(points):
+        try:
+            return ImageFont.load_default(size=points * pt)
+        except TypeError:
+            # Pillow before 10.1 only has a fixed size bitmap font
+            return ImageFont.load_default()
+    
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    
+    for i, j in edges:
+        draw.line([points[i], points[j]], fill=(77, 77, 77), width=round(1.5 * pt))
+    
+    if len(edges) <= MAX_EDGE_LABELS:
+        label_font = font(8)
+        for (i, j), interfaces in zip(edges, edge_interfaces):
+            x, y = (pixels[i] + pixels[j]) / 2
+            text = " - ".join(interfaces)
+            box = draw.textbbox((x, y), text, font=label_font, anchor='mm')
+            draw.rounded_rectangle(box, radius=3 * pt, fill='white')
+            draw.text((x, y), text, fill='black', font=label_font, anchor='mm')
+    
+    types = np.asarray(types)
+    for device_type, (color, area) in _NODE_STYLES.items():
+        radius = np.sqrt(area / np.pi) * pt
+        for x, y in pixels[types == device_type].tolist():
+            draw.ellipse([x - radius, y - radius, x + radius, y + radius], fill=color)
+    
+    name_font = font(10)
+    for point, name in zip(points, names):
+        draw.text(point, name, fill='black', font=name_font, anchor='mm')
+    
+    draw.text((width / 2, top / 2), title, fill='black', font=font(12), anchor='mm')
+    
+    image.resize(size, Image.LANCZOS).save(path)
+
+
 def main():
     """Main entry point for the network topology creator script."""
     import argparse
@@ -755,6 +1530,13 @@ def main():
                          help='Input JSON file to load the topology from')
     viz_parser.add_argument('--output', required=True,
                          help='Output image file to save the visualization')
+    viz_parser.add_argument('--dpi', type=int, default=150,
+                         help='Resolution of raster images, in dots per inch (default: 150)')
+    viz_parser.add_argument('--save-layout', action='store_true',
+                         help='Save the layout next to the input file, e.g. as ring.layout.json '
+                              'for ring.json, to be used by later visualizations')
+    viz_parser.add_argument('--force-mpl', action='store_true',
+                         help='Draw with matplotlib even if the topology is small enough for Pillow')
     
     args = parser.parse_args()
     
@@ -767,7 +1549,7 @@ def main():
             topology = NetworkTopology.create_mesh_network(args.switches, args.hosts)
         
         topology.save_to_file(args.output)
-        logger.info(f"Topology saved to {args.output}")
+        logger.info("Topology saved to %s", args.output)
     
     elif args.command == 'load':
         topology = NetworkTopology.load_from_file(args.input)
@@ -775,64 +1557,59 @@ def main():
         # Here you could add code to modify the topology
         
         topology.save_to_file(args.output)
-        logger.info(f"Modified topology saved to {args.output}")
+        logger.info("Modified topology saved to %s", args.output)
     
     elif args.command == 'visualize':
-        try:
-            import matplotlib.pyplot as plt
-            import networkx as nx
-        except ImportError:
-            logger.error("Visualization requires matplotlib and networkx. Install with: pip install matplotlib networkx")
-            return 1
-        
         topology = NetworkTopology.load_from_file(args.input)
         
-        # Create a graph from the topology
-        G = nx.Graph()
-        
-        # Add nodes
-        for device_id, device in topology.devices.items():
-            node_type = device.device_type
-            G.add_node(device_id, label=device.name, type=node_type)
-        
-        # Add edges
-        for device1_id, intf1, device2_id, intf2 in topology.connections:
-            G.add_edge(device1_id, device2_id, label=f"{intf1} - {intf2}")
-        
-        # Create the visualization
-        plt.figure(figsize=(12, 8))
-        
-        # Set positions
-        pos = nx.spring_layout(G, seed=42)
-        
-        # Draw nodes
-        switch_nodes = [n for n, attr in G.nodes(data=True) if attr.get('type') == 'switch']
-        host_nodes = [n for n, attr in G.nodes(data=True) if attr.get('type') == 'host']
+        # Nodes are referred to by their index in nodes; their labels and
+        # types are collected in the same pass
+        nodes = []
+        index = {}
+        names = []
+        types = []
+        for i, (device_id, device) in enumerate(topology.devices.items()):
+            nodes.append(device_id)
+            index[device_id] = i
+            names.append(device.name)
+            types.append(device.device_type)
+        
+        # One edge per pair of connected devices, with the interfaces of the last of its links
+        edge_interfaces = {}
+        for device1_id, intf1, device2_id, intf2 in topology.iter_connections():
+            i, j = index[device1_id], index[device2_id]
+            edge_interfaces[(i, j) if i <= j else (j, i)] = (intf1, intf2)
+        edges = list(edge_interfaces)
+        
+        use_pil = (len(nodes) < PIL_MAX_NODES and not args.force_mpl
+                   and args.output.lower().endswith('.png'))
+        try:
+            # Set positions, from the layout saved next to the topology if there
+            # is one, else reusing the layout of an earlier run on the same graph
+            layout_path = _precomputed_layout_path(args.input)
+            coords = _load_precomputed_layout(layout_path, nodes)
+            if coords is None:
+                cache_path = _layout_cache_path(nodes, edges, seed=42)
+                coords = _load_cached_layout(cache_path, nodes)
+                if coords is None:
+                    coords = _compute_layout(len(nodes), edges, seed=42)
+                    _save_cached_layout(cache_path, nodes, coords)
+            
+            if args.save_layout:
+                _save_precomputed_layout(layout_path, nodes, coords)
+                logger.info("Layout saved to %s", layout_path)
+            
+            render = _render_pil if use_pil else _render_matplotlib
+            render(args.output, f"Network Topology: {topology.name}", coords, names,
+                   types, edges, list(edge_interfaces.values()), dpi=args.dpi)
+        except ImportError as e:
+            package = (e.name or 'matplotlib').partition('.')[0]
+            logger.error("Visualization requires %s. Install with: pip install %s",
+                         package, _PIP_PACKAGES.get(package, package))
+            return 1
         
-        nx.draw_networkx_nodes(G, pos, nodelist=switch_nodes, node_color='lightblue', node_size=700)
-        nx.draw_networkx_nodes(G, pos, nodelist=host_nodes, node_color='lightgreen', node_size=500)
-
-        # Draw edges
-        nx.draw_networkx_edges(G, pos, width=1.5, alpha=0.7)
-
-        # Draw labels
-        node_labels = {n: G.nodes[n]['label'] for n in G.nodes()}
-        nx.draw_networkx_labels(G, pos, labels=node_labels, font_size=10, font_weight='bold')
-
-        # Add edge labels if not too crowded
-        if len(G.edges()) < 20:  # Only show edge labels for smaller graphs
-            edge_labels = {(u, v): G.edges[u, v]['label'] for u, v in G.edges()}
-            nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=8)
-
-        plt.title(f"Network Topology: {topology.name}")
-        plt.axis('off')  # Turn off axis
-
-        # Save the figure
-        plt.tight_layout()
-        plt.savefig(args.output, dpi=300, bbox_inches='tight')
-        logger.info(f"Visualization saved to {args.output}")
-        plt.close()
-
+        logger.info("Visualization saved to %s", args.output)
+    
     else:
         parser.print_help()
         return 1